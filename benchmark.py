@@ -0,0 +1,152 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import time
+import multiprocessing as mp
+import numpy as np
+from profiling import profiler
+
+
+COLUMNS = ['date', 'nodes', 'edges', 'backend', 'stage', 'wall_time', 'cpu_time', 'items_per_sec', 'peak_rss_mb']
+
+
+def synthetic_inputs(work_dir, n, seed=0, mean_degree=10, mu=0.3, noise=0.1):
+    # an LFR-style network with its planted clustering, plus a copy of the clustering with a fraction of the nodes
+    # moved to random clusters to score against it; generated once per size and reused
+    from lfr_native import generate_lfr, write_lfr_text
+    base = os.path.join(work_dir, 'bench_%d' % n)
+    paths = {'dir': base, 'net': os.path.join(base, 'network.dat'), 'gt': os.path.join(base, 'community.dat'),
+             'est': os.path.join(base, 'estimate.dat')}
+    if all(os.path.exists(paths[k]) for k in ('net', 'gt', 'est')):
+        return paths
+    os.makedirs(base, exist_ok=True)
+    print('generating %d-node synthetic network in %s' % (n, base), flush=True)
+    params = {'N': n, 'k': mean_degree, 'maxk': max(50, int(n ** 0.5)), 'mu': mu, 'minc': 10,
+              'maxc': max(20, min(5000, n // 100)), 't1': 2.5, 't2': 1.5}
+    edges, membership = generate_lfr(params, seed)
+    write_lfr_text(base, edges, membership)
+    rng = np.random.default_rng(seed)
+    moved = rng.random(n) < noise
+    membership[moved] = rng.integers(0, membership.max() + 1, int(moved.sum()))
+    np.savetxt(paths['est'], np.stack([np.arange(1, n + 1), membership + 1], axis=1), fmt='%d', delimiter='\t')
+    return paths
+
+
+def run_stage(name, func, items, rows):
+    with profiler.stage(name):
+        result = func()
+    record = profiler.records[-1]
+    rows.append({'stage': name, 'wall_time': record['wall_time'], 'cpu_time': record['cpu_time'],
+                 'items_per_sec': items / record['wall_time'] if record['wall_time'] > 0 else float('inf'),
+                 'peak_rss_mb': record['peak_rss_mb']})
+    return result
+
+
+def bench_backend(task):
+    # one backend on one input, in a fresh process so that memory peaks are not inherited from other runs
+    paths, backend, legacy = task
+    from graph_backends import BACKENDS
+    from estimate_properties import network_statistics, clustering_statistics
+    from network_arrays import mixing_param_from_arrays, modularity_from_arrays
+    profiler.enable()
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph = run_stage('load', lambda: BACKENDS[backend].read(paths['net']), 1, rows)
+        edge_count = run_stage('network_statistics', lambda: network_statistics(graph), 1, rows)[1]
+        for row in rows:
+            row['items_per_sec'] *= edge_count  # the edge count is only known once the statistics are done
+        nodes, src, dst = run_stage('edge_arrays', graph.edge_arrays, edge_count, rows)
+        membership = run_stage('read_membership', lambda: graph.read_membership(paths['gt']), len(nodes), rows)
+        labels = graph.labels(membership)
+        run_stage('mixing_param', lambda: mixing_param_from_arrays(src, dst, labels), edge_count, rows)
+        run_stage('modularity', lambda: modularity_from_arrays(src, dst, labels), edge_count, rows)
+        if legacy:
+            run_stage('mixing_param_edges', lambda: graph.mixing_param_edges(membership), edge_count, rows)
+        run_stage('clustering_statistics', lambda: clustering_statistics(graph, membership, modularity_score=0),
+                  len(nodes), rows)
+    for row in rows:
+        row.update(nodes=len(nodes), edges=edge_count, backend=backend)
+    return rows
+
+
+def bench_shared(task):
+    # stages that do not depend on the graph backend
+    paths, fitters, accuracy = task
+    from fast_io import parse_int_pairs
+    from powerlaw_cache import fit_powerlaw
+    from lfr_accuracy import measure_accuracy
+    profiler.enable()
+    rows = []
+    edges = parse_int_pairs(paths['net'])
+    n = int(edges.max())
+    degrees = np.bincount(edges.ravel(), minlength=n + 1)[1:]
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        for fitter in fitters:
+            run_stage('fit:' + fitter, lambda: fit_powerlaw(degrees, discrete=True, fitter=fitter), n, rows)
+        if accuracy:
+            mem_true = parse_int_pairs(paths['gt'])[:, 1]
+            mem_est = parse_int_pairs(paths['est'])[:, 1]
+            run_stage('measure_accuracy', lambda: measure_accuracy(mem_true, mem_est), n, rows)
+    for row in rows:
+        row.update(nodes=n, edges=len(edges), backend='-')
+    return rows
+
+
+def run_isolated(func, task):
+    with mp.get_context('fork').Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(func, (task,))
+
+
+def write_results(rows, out_path):
+    new_file = not os.path.exists(out_path)
+    with open(out_path, 'a') as f:
+        if new_file:
+            f.write('\t'.join(COLUMNS) + '\n')
+        for row in rows:
+            f.write('\t'.join(str(row[c]) if not isinstance(row[c], float) else '%.6g' % row[c]
+                              for c in COLUMNS) + '\n')
+
+
+def print_table(rows):
+    print('%10s %10s %-10s %-22s %10s %14s %10s' % ('nodes', 'edges', 'backend', 'stage', 'wall(s)', 'items/s',
+                                                    'peak(MB)'))
+    for r in rows:
+        print('%10d %10d %-10s %-22s %10.3f %14.0f %10.1f' % (r['nodes'], r['edges'], r['backend'], r['stage'],
+                                                              r['wall_time'], r['items_per_sec'], r['peak_rss_mb']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarking the estimator and accuracy stages on synthetic '
+                                                 'networks of increasing size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7],
+                        help='node counts of the synthetic networks')
+    parser.add_argument('--backends', type=str, nargs='+', default=['networkx', 'networkit', 'csr'],
+                        help='graph backends to benchmark (networkit is skipped when not installed)')
+    parser.add_argument('--fitters', type=str, nargs='+', default=['powerlaw', 'histogram'],
+                        help='power-law fitters to benchmark on the degree sequence')
+    parser.add_argument('--networkx-max-nodes', type=int, default=10 ** 6,
+                        help='largest network run with the networkx backend and the per-edge mixing parameter')
+    parser.add_argument('--accuracy-max-nodes', type=int, default=10 ** 7,
+                        help='largest network scored with measure_accuracy')
+    parser.add_argument('--work-dir', type=str, default='benchmark_data',
+                        help='directory for the generated networks, reused across runs')
+    parser.add_argument('-o', metavar='results', type=str, default='benchmark_results.tsv',
+                        help='TSV file the results are appended to')
+    args = parser.parse_args()
+    backends = [b for b in args.backends if b != 'networkit' or importlib.util.find_spec('networkit') is not None]
+    date = time.strftime('%Y-%m-%dT%H:%M:%S')
+    for n in args.sizes:
+        paths = synthetic_inputs(args.work_dir, n)
+        rows = []
+        for backend in backends:
+            if backend == 'networkx' and n > args.networkx_max_nodes:
+                continue
+            print('benchmarking %s on %d nodes' % (backend, n), flush=True)
+            rows += run_isolated(bench_backend, (paths, backend, n <= args.networkx_max_nodes))
+        rows += run_isolated(bench_shared, (paths, args.fitters, n <= args.accuracy_max_nodes))
+        for row in rows:
+            row['date'] = date
+        print_table(rows)
+        write_results(rows, args.o)
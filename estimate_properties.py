@@ -1,13 +1,29 @@
 import argparse
-import networkx as nx
-import powerlaw
 import numpy as np
 import json
-from collections import defaultdict
-from networkx.algorithms.community import modularity
-import matplotlib.pyplot as plt
+import multiprocessing as mp
+from graph_backends import read_graph, BACKENDS
+from network_arrays import mixing_param_from_arrays, modularity_from_arrays
+from powerlaw_cache import cached_powerlaw_fit, fit_powerlaw, DEFAULT_CACHE_DIR
+from streaming_stats import streaming_statistics
+from incremental_stats import build_state, save_state, state_path, update_statistics
+from fast_io import stats_path
+from profiling import profiler, profile_path
 
 
+# the JSON keys each selectable statistic produces; heavy libraries are only imported by the stages that run
+STATISTICS = {
+    'network': ['node-count', 'edge-count', 'isolate-count', 'min-degree', 'max-degree', 'mean-degree',
+                'median-degree'],
+    'components': ['num-connected-components', 'max-connected-components'],
+    'degree-fit': ['tau1', 'xmin1', 'tau1-fixed', 'xmin1-fixed'],
+    'clusters': ['num-clusters', 'min-cluster-size', 'max-cluster-size', 'mean-cluster-size', 'median-cluster-size',
+                 'num-singletons', 'num-non-singletons', 'node-coverage'],
+    'cluster-size-fit': ['tau2', 'xmin2', 'tau2-fixed', 'xmin2-fixed'],
+    'mixing': ['mixing-parameter'],
+    'modularity': ['modularity-score'],
+}
+
 def membership_to_partition(membership):
     part_dict = {}
     for index, value in membership.items():
@@ -19,6 +35,7 @@ def membership_to_partition(membership):
 
 
 def plot_dist(dist, name):
+    import matplotlib.pyplot as plt
     plt.cla()
     plt.grid(linestyle='--', linewidth=0.5)
     x = np.arange(1, len(dist)+1)
@@ -27,47 +44,26 @@ def plot_dist(dist, name):
     plt.savefig(name+'_dist.pdf')
 
 
-def get_membership_list_from_file(net, file_name):
-    membership = dict()
-    with open(file_name) as f:
-        for line in f:
-            i, m = line.strip().split()
-            if int(i) in net.nodes:
-                membership[int(i)] = m
-    return membership
-
-
 def write_membership_list_to_file(file_name, membership):
     with open(file_name, 'w') as f:
         f.write('\n'.join(str(i)+' '+str(membership[i]+1) for i in range(len(membership))))
 
 
-def compute_mixing_param(net, membership):
-    n = net.number_of_nodes()
-    in_degree = defaultdict(int)
-    out_degree = defaultdict(int)
-    for n1, n2 in net.edges:
-        if membership[n1] == membership[n2]: # nodes are co-clustered
-            in_degree[n1] += 1
-            in_degree[n2] += 1
-        else:
-            out_degree[n1] += 1
-            out_degree[n2] += 1
-    mus = [out_degree[i]/(out_degree[i]+in_degree[i]) if (out_degree[i]+in_degree[i]) != 0 else 0 for i in net.nodes]
-    mixing_param = np.mean(mus)
-    return mixing_param
+def clustering_statistics(graph, membership, show_cluster_size_dist=False, modularity_score=None, modularity=True):
+    # without modularity, the score is neither computed nor printed and is None in the summary
+    cluster_sizes = [len(c) for c in membership_to_partition(membership)]
+    if modularity and modularity_score is None:
+        modularity_score = graph.modularity_edges(membership)
+    return cluster_summary(cluster_sizes, graph.node_count(), modularity_score, show_cluster_size_dist)
 
 
-def clustering_statistics(net, membership, show_cluster_size_dist=False):
-    partition = membership_to_partition(membership)
-    cluster_num = len(partition)
-    cluster_sizes = [len(c) for c in partition]
+def cluster_summary(cluster_sizes, node_count, modularity_score, show_cluster_size_dist=False):
+    # cluster_sizes has one entry per non-empty cluster; node_count counts the nodes of the clustering
+    cluster_num = len(cluster_sizes)
     min_size, max_size, mean_size, median_size = int(np.min(cluster_sizes)), int(np.max(cluster_sizes)), \
                                                  np.mean(cluster_sizes), np.median(cluster_sizes)
-    singletons_num = cluster_sizes.count(1)
+    singletons_num = int(np.sum(np.asarray(cluster_sizes) == 1))
     non_singleton_num = cluster_num - singletons_num
-    modularity_score = modularity(net, partition)
-    node_count = net.number_of_nodes()
     coverage = (node_count - singletons_num) / node_count
     print('#clusters in partition:', cluster_num)
     if show_cluster_size_dist:
@@ -75,74 +71,83 @@ def clustering_statistics(net, membership, show_cluster_size_dist=False):
     print('min, max, mean, median cluster sizes:', min_size, max_size, mean_size, median_size)
     print('number of singletons:', singletons_num)
     print('number of non-singleton clusters:', non_singleton_num)
-    print('modularity:', modularity_score)
+    if modularity_score is not None:
+        print('modularity:', modularity_score)
     print('coverage:', coverage)
     return cluster_num, cluster_sizes, min_size, max_size, mean_size, median_size, singletons_num, \
            non_singleton_num, modularity_score, coverage
 
 
-def network_statistics(graph, show_connected_components=False):
-    node_count, edge_count = graph.number_of_nodes(), graph.number_of_edges()
-    isolate_count = len(list(nx.isolates(graph)))
-    connected_components_sizes = [len(c) for c in nx.connected_components(graph)]
-    connected_component_num = len(connected_components_sizes)
-    max_connected_component = max(connected_components_sizes)
-    degrees = [d for _, d in graph.degree()]
+def network_statistics(graph, show_connected_components=False, processes=1, components=True):
+    # without components, the connected component count and size are None
+    if processes > 1:
+        node_count, edge_count, degrees, isolate_count, connected_components_sizes = \
+            graph.parallel_network_statistics(processes, components)
+    else:
+        node_count, edge_count, degrees, isolate_count, connected_components_sizes = \
+            graph.network_statistics(components)
+    return network_summary(node_count, edge_count, degrees, isolate_count, connected_components_sizes,
+                           show_connected_components)
+
+
+def network_summary(node_count, edge_count, degrees, isolate_count, connected_components_sizes,
+                    show_connected_components=False):
+    # connected_components_sizes is None when components were not computed
+    components = connected_components_sizes is not None
+    connected_component_num, max_connected_component = None, None
     min_degree, max_degree, mean_degree, median_degree = int(np.min(degrees)), int(np.max(degrees)), \
                                                          np.mean(degrees), np.median(degrees)
     print('#nodes, #edges, #isolates:', node_count, edge_count, isolate_count)
-    print('num connected comp:', connected_component_num)
-    print('max connected comp:', max_connected_component)
-    if show_connected_components:
-        print(sorted(connected_components_sizes, reverse=True))
+    if components:
+        connected_component_num = len(connected_components_sizes)
+        max_connected_component = int(max(connected_components_sizes))
+        print('num connected comp:', connected_component_num)
+        print('max connected comp:', max_connected_component)
+        if show_connected_components:
+            print(sorted(connected_components_sizes, reverse=True))
     print('min, max, mean, median degree:', min_degree, max_degree, mean_degree, median_degree)
     return node_count, edge_count, degrees, isolate_count, connected_component_num, max_connected_component, \
            min_degree, max_degree, mean_degree, median_degree
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Estimating properties of a network/clustering pair.')
-    parser.add_argument('-n', metavar='net', type=str, required=True,
-                        help='network edge-list path')
-    parser.add_argument('-c', metavar='clustering', type=str, required=True,
-                        help='clustering membership path')
-    args = parser.parse_args()
-
-    print('- properties of the input network')
-    net = nx.read_edgelist(args.n, nodetype=int)
-    node_count, edge_count, degrees, isolate_count, connected_component_num, max_connected_component, \
-    min_degree, max_degree, mean_degree, median_degree = network_statistics(net)
-
-    print('\n- properties of the input clustering')
-    membership = get_membership_list_from_file(net, args.c)
-    cluster_num, cluster_sizes, min_size, max_size, mean_size, median_size, singletons_num, non_singleton_num, \
-    modularity_score, coverage = clustering_statistics(net, membership)
+def powerlaw_fit(values, min_value, fit_options=None):
+    # fit_options: 'fitter' ('powerlaw' or 'histogram'), 'processes' for the xmin scan, 'cache' directory
+    fit_options = fit_options or {}
+    fitter, processes = fit_options.get('fitter', 'powerlaw'), fit_options.get('processes', 1)
+    if fit_options.get('cache'):
+        tau, xmin = cached_powerlaw_fit(values, discrete=True, cache_dir=fit_options['cache'],
+                                        fitter=fitter, processes=processes)
+        tau_fixed, xmin_fixed = cached_powerlaw_fit(values, discrete=True, xmin=min_value,
+                                                    cache_dir=fit_options['cache'], fitter=fitter)
+        return tau, xmin, tau_fixed, xmin_fixed
+    if fitter != 'powerlaw':
+        tau, xmin = fit_powerlaw(values, discrete=True, fitter=fitter, processes=processes)
+        tau_fixed, xmin_fixed = fit_powerlaw(values, discrete=True, xmin=min_value, fitter=fitter)
+        return tau, xmin, tau_fixed, xmin_fixed
+    import powerlaw
+    dist = powerlaw.Fit(values, discrete=True)
+    dist_fixed = powerlaw.Fit(values, discrete=True, xmin=min_value)
+    return dist.power_law.alpha, dist.power_law.xmin, dist_fixed.power_law.alpha, dist_fixed.power_law.xmin
 
-    degree_dist = powerlaw.Fit(degrees, discrete=True)
-    tau1 = degree_dist.power_law.alpha
-    xmin1 = degree_dist.power_law.xmin
-
-    degree_dist_fixed = powerlaw.Fit(degrees, discrete=True, xmin=min_degree)
-    tau1_fixed = degree_dist_fixed.power_law.alpha
-    xmin1_fixed = degree_dist_fixed.power_law.xmin
-
-    #powerlaw.plot_pdf(community_sizes, color='b')
 
-    community_size_dist = powerlaw.Fit(cluster_sizes, discrete=True)
-    tau2 = community_size_dist.power_law.alpha
-    xmin2 = community_size_dist.power_law.xmin
+def estimate_network(graph, fit_options=None, processes=1, statistics=STATISTICS):
+    summary = None
+    if {'network', 'components', 'degree-fit'} & set(statistics):
+        with profiler.stage('network_statistics'):
+            summary = network_statistics(graph, processes=processes, components='components' in statistics)
+    return network_estimates(summary, fit_options, statistics)
 
-    community_size_dist_fixed = powerlaw.Fit(cluster_sizes, discrete=True, xmin=min_size)
-    tau2_fixed = community_size_dist_fixed.power_law.alpha
-    xmin2_fixed = community_size_dist_fixed.power_law.xmin
 
-    mu=compute_mixing_param(net, membership)
-
-    print('mixing parameter (mu):', mu)
-    print('tau1, xmin1, tau2, xmin2', tau1, xmin1, tau2, xmin2)
-    print('tau1, xmin1, tau2, xmin2 [fixed xmin]', tau1_fixed, xmin1_fixed, tau2_fixed, xmin2_fixed)
-
-    net_cluster_stats = {
+def network_estimates(summary, fit_options=None, statistics=STATISTICS):
+    # summary is the tuple of network_summary, or None when no network statistic is selected; statistics not in
+    # `statistics` are left as None
+    node_count, edge_count, degrees, isolate_count, connected_component_num, max_connected_component, min_degree, \
+    max_degree, mean_degree, median_degree = summary or [None] * 10
+    tau1, xmin1, tau1_fixed, xmin1_fixed = [None] * 4
+    if 'degree-fit' in statistics:
+        with profiler.stage('degree_fit'):
+            tau1, xmin1, tau1_fixed, xmin1_fixed = powerlaw_fit(degrees, min_degree, fit_options)
+    net_stats = {
         "node-count": node_count,
         "edge-count": edge_count,
         "isolate-count": isolate_count,
@@ -152,6 +157,74 @@ if __name__ == "__main__":
         "max-degree": max_degree,
         "mean-degree": mean_degree,
         "median-degree": median_degree,
+    }
+    degree_fit = {
+        "tau1": tau1,
+        "xmin1": xmin1,
+        "tau1-fixed": tau1_fixed,
+        "xmin1-fixed": xmin1_fixed,
+    }
+    return net_stats, degree_fit
+
+
+def estimate_clustering(graph, net_stats, degree_fit, clustering_path, mixing_mode='csr', cache=False,
+                        fit_options=None, keep_state=False, statistics=STATISTICS):
+    print('\n- properties of the input clustering', clustering_path)
+    with profiler.stage('read_membership'):
+        membership = graph.read_membership(clustering_path, cache)
+    mu, modularity_score = None, None
+    with profiler.stage('mixing_and_modularity'):
+        if mixing_mode == 'csr' and {'mixing', 'modularity'} & set(statistics):
+            _, src, dst = graph.edge_arrays()
+            labels = graph.labels(membership)
+            if 'mixing' in statistics:
+                mu = mixing_param_from_arrays(src, dst, labels)
+            if 'modularity' in statistics:
+                modularity_score = modularity_from_arrays(src, dst, labels)
+        elif mixing_mode != 'csr':
+            if 'mixing' in statistics:
+                mu = graph.mixing_param_edges(membership)
+            if 'modularity' in statistics:
+                modularity_score = graph.modularity_edges(membership)
+    summary = None
+    if {'clusters', 'cluster-size-fit'} & set(statistics):
+        with profiler.stage('clustering_statistics'):
+            summary = clustering_statistics(graph, membership, modularity_score=modularity_score,
+                                            modularity='modularity' in statistics)
+
+    if keep_state:
+        with profiler.stage('save_state'):
+            save_state(state_path(clustering_path), *build_state(*graph.edge_arrays(), membership))
+
+    return write_clustering_statistics(clustering_path, net_stats, degree_fit, summary, mu, modularity_score,
+                                       fit_options, statistics)
+
+
+def write_clustering_statistics(clustering_path, net_stats, degree_fit, summary, mu, modularity_score,
+                                fit_options=None, statistics=STATISTICS):
+    # fits the cluster sizes and writes the JSON of one clustering; summary is the tuple of cluster_summary, or None
+    # when no cluster statistic is selected
+    cluster_num, cluster_sizes, min_size, max_size, mean_size, median_size, singletons_num, non_singleton_num, _, \
+    coverage = summary or [None] * 10
+    tau2, xmin2, tau2_fixed, xmin2_fixed = [None] * 4
+
+    #powerlaw.plot_pdf(community_sizes, color='b')
+
+    if 'cluster-size-fit' in statistics:
+        with profiler.stage('cluster_size_fit'):
+            tau2, xmin2, tau2_fixed, xmin2_fixed = powerlaw_fit(cluster_sizes, min_size, fit_options)
+
+    if summary is None and modularity_score is not None:
+        print('modularity:', modularity_score)
+    if mu is not None:
+        print('mixing parameter (mu):', mu)
+    if {'degree-fit', 'cluster-size-fit'} & set(statistics):
+        print('tau1, xmin1, tau2, xmin2', degree_fit['tau1'], degree_fit['xmin1'], tau2, xmin2)
+        print('tau1, xmin1, tau2, xmin2 [fixed xmin]', degree_fit['tau1-fixed'], degree_fit['xmin1-fixed'],
+              tau2_fixed, xmin2_fixed)
+
+    net_cluster_stats = dict(net_stats)
+    net_cluster_stats.update({
         "num-clusters": cluster_num,
         "min-cluster-size": min_size,
         "max-cluster-size": max_size,
@@ -162,16 +235,162 @@ if __name__ == "__main__":
         "modularity-score": modularity_score,
         "node-coverage": coverage,
         "mixing-parameter": mu,
-        "tau1": tau1,
-        "xmin1": xmin1,
+        "tau1": degree_fit['tau1'],
+        "xmin1": degree_fit['xmin1'],
         "tau2": tau2,
         "xmin2": xmin2,
-        "tau1-fixed": tau1_fixed,
-        "xmin1-fixed": xmin1_fixed,
+        "tau1-fixed": degree_fit['tau1-fixed'],
+        "xmin1-fixed": degree_fit['xmin1-fixed'],
         "tau2-fixed": tau2_fixed,
         "xmin2-fixed": xmin2_fixed
-    }
+    })
+    keys = [key for statistic in statistics for key in STATISTICS[statistic]]
+    net_cluster_stats = {key: value for key, value in net_cluster_stats.items() if key in keys}
 
-    with open(args.c.replace('.tsv', '')+".json", "w") as f:
+    out_path = stats_path(clustering_path)
+    with open(out_path, "w") as f:
         json_object = json.dumps(net_cluster_stats, indent=4)
         f.write(json_object)
+    return out_path
+
+
+# set before the pool is forked so that workers share the loaded graph instead of pickling it
+batch_context = {}
+
+
+def estimate_clustering_in_pool(clustering_path):
+    first_record = len(profiler.records)  # a worker may serve several clusterings
+    with profiler.stage('clustering:' + clustering_path):
+        out_path = estimate_clustering(batch_context['graph'], batch_context['net_stats'], batch_context['degree_fit'],
+                                       clustering_path, batch_context['mixing_mode'], batch_context['cache'],
+                                       batch_context['fit_options'], batch_context['keep_state'],
+                                       batch_context['statistics'])
+    return out_path, profiler.records[first_record:]
+
+
+def estimate_clusterings(graph, clustering_paths, mixing_mode='csr', cache=False, processes=1, fit_options=None,
+                         network_processes=1, keep_state=False, statistics=STATISTICS):
+    net_stats, degree_fit = estimate_network(graph, fit_options, network_processes, statistics)
+    if mixing_mode == 'csr' and ({'mixing', 'modularity'} & set(statistics) or keep_state):
+        with profiler.stage('edge_arrays'):
+            graph.edge_arrays()  # built once here rather than in every clustering or worker
+    if processes <= 1 or len(clustering_paths) <= 1:
+        out_paths = []
+        for path in clustering_paths:
+            with profiler.stage('clustering:' + path):
+                out_paths.append(estimate_clustering(graph, net_stats, degree_fit, path, mixing_mode, cache,
+                                                     fit_options, keep_state, statistics))
+        return out_paths
+    batch_context.update(graph=graph, net_stats=net_stats, degree_fit=degree_fit, mixing_mode=mixing_mode, cache=cache,
+                         fit_options=fit_options, keep_state=keep_state, statistics=statistics)
+    with mp.get_context('fork').Pool(processes) as pool:
+        results = pool.map(estimate_clustering_in_pool, clustering_paths, chunksize=1)
+    for _, records in results:
+        profiler.merge(records)
+    return [out_path for out_path, _ in results]
+
+
+def estimate_clusterings_streaming(edge_path, clustering_paths, fit_options=None, work_dir=None):
+    print('- properties of the input network (streaming)')
+    network, clusterings = streaming_statistics(edge_path, clustering_paths, work_dir)
+    net_stats, degree_fit = network_estimates(network_summary(*network), fit_options)
+    out_paths = []
+    for clustering_path, (node_count, cluster_sizes, mu, modularity_score) in zip(clustering_paths, clusterings):
+        print('\n- properties of the input clustering', clustering_path)
+        summary = cluster_summary(cluster_sizes, node_count, modularity_score)
+        out_paths.append(write_clustering_statistics(clustering_path, net_stats, degree_fit, summary, mu,
+                                                     modularity_score, fit_options))
+    return out_paths
+
+
+def update_clustering(previous_clustering, diff_path, clustering_path, fit_options=None):
+    # statistics of clustering_path, given as the clustering of previous_clustering with the nodes listed in
+    # diff_path moved to their new clusters; the network statistics and degree fit are carried over
+    with open(stats_path(previous_clustering)) as f:
+        previous_stats = json.load(f)
+    net_stats = {key: value for key, value in previous_stats.items()
+                 if key in STATISTICS['network'] + STATISTICS['components']}
+    degree_fit = {key: previous_stats.get(key) for key in STATISTICS['degree-fit']}
+    moved, node_count, cluster_sizes, mu, modularity_score = update_statistics(previous_clustering, diff_path,
+                                                                               clustering_path)
+    print('- properties of the input clustering', clustering_path, '(%d nodes moved from %s)' %
+          (moved, previous_clustering))
+    summary = cluster_summary(cluster_sizes, node_count, modularity_score)
+    return write_clustering_statistics(clustering_path, net_stats, degree_fit, summary, mu, modularity_score,
+                                       fit_options)
+
+
+def main(default_backend='auto'):
+    parser = argparse.ArgumentParser(description='Estimating properties of a network/clustering pair.')
+    parser.add_argument('-n', metavar='net', type=str, required=False,
+                        help='network edge-list path')
+    parser.add_argument('-c', metavar='clustering', type=str, nargs='+', required=True,
+                        help='clustering membership path(s); the network is loaded and summarized once for all of them')
+    parser.add_argument('-p', metavar='processes', type=int, default=1,
+                        help='number of processes used to evaluate the clusterings')
+    parser.add_argument('--backend', type=str, choices=['auto'] + list(BACKENDS), default=default_backend,
+                        help='graph library used for the network statistics; auto (default) picks networkx, networkit '
+                             'or csr (NumPy/SciPy arrays) by edge-list size; node ids need not be 0..n-1')
+    parser.add_argument('--network-processes', metavar='processes', type=int, default=1,
+                        help='number of processes sharing the connected components and degree computation')
+    parser.add_argument('--mixing-mode', type=str, choices=['csr', 'edges'], default='csr',
+                        help='compute the mixing parameter and modularity with vectorized CSR arrays (default) or by '
+                             'iterating edges (with networkx modularity on the networkx backend)')
+    parser.add_argument('--cache', action='store_true',
+                        help='parse inputs in bulk and keep a binary cache next to them for later runs')
+    parser.add_argument('--fit-cache', metavar='dir', type=str, nargs='?', const=DEFAULT_CACHE_DIR,
+                        help='reuse power-law fits stored in this directory (default: %s)' % DEFAULT_CACHE_DIR)
+    parser.add_argument('--fitter', type=str, choices=['powerlaw', 'histogram'], default='powerlaw',
+                        help='fit power laws with the powerlaw package (default) or the in-project histogram fitter')
+    parser.add_argument('--fit-processes', metavar='processes', type=int, default=1,
+                        help='number of processes used to scan xmin candidates with the histogram fitter')
+    parser.add_argument('--streaming', action='store_true',
+                        help='compute statistics in two chunked passes over the edge list without building a graph '
+                             '(for graphs that do not fit in memory)')
+    parser.add_argument('--work-dir', type=str, required=False,
+                        help='directory for the disk-backed union-find of --streaming (default: system temp dir)')
+    parser.add_argument('--save-state', action='store_true',
+                        help='keep per-node and per-cluster counts of each clustering in <clustering>.state, so that '
+                             'later edits of it can be evaluated with --update')
+    parser.add_argument('--update', metavar='clustering', type=str, required=False,
+                        help='previous clustering, evaluated before with --save-state; the clustering given with -c '
+                             'is that clustering with the nodes listed in --diff moved, and only those nodes and their '
+                             'edges are revisited (no -n needed)')
+    parser.add_argument('--diff', metavar='membership', type=str, required=False,
+                        help='with --update, node/cluster lines for the nodes whose cluster changed; cluster ids not '
+                             'in the previous clustering start new clusters')
+    parser.add_argument('--statistics', type=str, nargs='+', choices=list(STATISTICS), default=list(STATISTICS),
+                        help='statistics to compute and write (default: all): network (node, edge and isolate counts '
+                             'and degrees), components, degree-fit (tau1), clusters (cluster sizes and coverage), '
+                             'cluster-size-fit (tau2), mixing, modularity; the rest are skipped')
+    parser.add_argument('--profile', metavar='path', type=str, nargs='?', const='',
+                        help='write per-stage wall time, cpu time and memory as JSON (default path: next to the '
+                             'first clustering, <clustering>.profile.json)')
+    args = parser.parse_args()
+    if args.update is not None and (args.diff is None or len(args.c) != 1):
+        parser.error('--update needs --diff and a single clustering path in -c')
+    if args.update is None and args.n is None:
+        parser.error('the following arguments are required: -n')
+    if (args.streaming or args.update is not None) and set(args.statistics) != set(STATISTICS):
+        parser.error('--statistics cannot be combined with --streaming or --update, which compute all of them')
+    if args.profile is not None:
+        profiler.enable()
+    fit_options = {'fitter': args.fitter, 'processes': args.fit_processes, 'cache': args.fit_cache}
+    if args.update is not None:
+        with profiler.stage('update'):
+            update_clustering(args.update, args.diff, args.c[0], fit_options)
+    elif args.streaming:
+        with profiler.stage('streaming'):
+            estimate_clusterings_streaming(args.n, args.c, fit_options, args.work_dir)
+    else:
+        print('- properties of the input network')
+        with profiler.stage('load'):
+            graph = read_graph(args.n, args.backend, args.cache)
+        estimate_clusterings(graph, args.c, args.mixing_mode, args.cache, args.p, fit_options, args.network_processes,
+                             args.save_state, args.statistics)
+    if args.profile is not None:
+        profiler.write(args.profile or profile_path(args.c[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import glob
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+CHUNK_BYTES = 64 * 1024 * 1024
+BINARY_SUFFIXES = ('.npy', '.npz')
+SPACE_BYTES = np.zeros(256, dtype=bool)
+SPACE_BYTES[list(b' \t\r\n\v\f')] = True
+
+
+def cache_path(file_name, tag):
+    st = os.stat(file_name)
+    return '%s.%s.%d-%d.npy' % (file_name, tag, st.st_size, st.st_mtime_ns)
+
+
+def read_chunks(file_name, chunk_bytes=CHUNK_BYTES):
+    # yields byte blocks that always end on a line boundary
+    with open(file_name, 'rb') as f:
+        tail = b''
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b'\n') + 1
+            if cut == 0:
+                tail = block
+                continue
+            tail = block[cut:]
+            yield block[:cut]
+        if tail:
+            yield tail
+
+
+def parse_chunk(block):
+    if b'#' in block:
+        block = b'\n'.join(line for line in block.split(b'\n') if not line.lstrip().startswith(b'#'))
+    try:
+        values = np.fromstring(block.decode(), dtype=np.int64, sep=' ')
+    except ValueError:
+        values = np.empty(0, dtype=np.int64)  # a token that is not an integer
+    # every line starting with a token and two values per line; anything else (blank or indented lines, or a
+    # third column, e.g. weights, which must not be re-paired into edges) is checked line by line
+    data = np.frombuffer(block, dtype=np.uint8)
+    line_starts = np.flatnonzero(data == ord('\n')) + 1
+    lines = len(line_starts) + (len(data) > 0 and data[-1] != ord('\n'))
+    line_starts = np.concatenate([[0], line_starts[line_starts < len(data)]]) if len(data) else line_starts[:0]
+    if len(values) != 2 * lines or SPACE_BYTES[data[line_starts]].any():
+        lines = 0
+        for line in block.split(b'\n'):
+            columns = len(line.split())
+            if columns not in (0, 2):
+                raise ValueError('expected two integer columns per line, got %r' % line.decode(errors='replace'))
+            lines += columns == 2
+        if lines == 0:
+            values = values[:0]  # fromstring reads a whitespace-only block as one zero
+        if len(values) != 2 * lines:
+            raise ValueError('expected two integer columns per line')
+    return values.reshape(-1, 2)
+
+
+def parse_int_pairs(file_name, threads=None, chunk_bytes=CHUNK_BYTES):
+    # at most two chunks per thread are read ahead, so memory does not grow with the file
+    threads = threads or os.cpu_count()
+    parts, pending = [], deque()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for block in read_chunks(file_name, chunk_bytes):
+            if len(pending) >= 2 * threads:
+                parts.append(pending.popleft().result())
+            pending.append(pool.submit(parse_chunk, block))
+        parts.extend(future.result() for future in pending)
+    if not parts:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(parts)
+
+
+def is_binary_pairs(file_name):
+    return file_name.endswith(BINARY_SUFFIXES)
+
+
+def load_binary_pairs(file_name):
+    # .npy files are memory-mapped; .npz archives are compressed and have to be read in full
+    if file_name.endswith('.npz'):
+        with np.load(file_name) as archive:
+            return archive['pairs']
+    return np.load(file_name, mmap_mode='r')
+
+
+def stats_path(clustering_path):
+    # where the statistics of a clustering are written: next to it, without the .tsv or binary suffix
+    if is_binary_pairs(clustering_path):
+        return clustering_path[:-len('.npy')] + '.json'
+    return clustering_path.replace('.tsv', '')+".json"
+
+
+def save_binary_pairs(file_name, pairs, compress=False):
+    # int32 unless the ids do not fit; the suffix (.npy or .npz) is added here
+    pairs = np.asarray(pairs)
+    dtype = np.int32 if len(pairs) == 0 or (pairs.min() >= -2 ** 31 and pairs.max() < 2 ** 31) else np.int64
+    if compress:
+        np.savez_compressed(file_name + '.npz', pairs=pairs.astype(dtype, copy=False))
+        return file_name + '.npz'
+    np.save(file_name + '.npy', pairs.astype(dtype, copy=False))
+    return file_name + '.npy'
+
+
+def load_int_pairs(file_name, tag, use_cache=True, threads=None):
+    if is_binary_pairs(file_name):
+        return load_binary_pairs(file_name)
+    if not use_cache:
+        return parse_int_pairs(file_name, threads)
+    path = cache_path(file_name, tag)
+    if os.path.exists(path):
+        return np.load(path, mmap_mode='r')
+    pairs = parse_int_pairs(file_name, threads)
+    # drop caches written for older versions of the same file
+    for stale in glob.glob(glob.escape(file_name) + '.' + tag + '.*.npy'):
+        os.remove(stale)
+    np.save(path, pairs)
+    return np.load(path, mmap_mode='r')
+
+
+def load_edge_list(file_name, use_cache=True, threads=None):
+    return load_int_pairs(file_name, 'edges', use_cache, threads)
+
+
+def load_membership(file_name, use_cache=True, threads=None):
+    return load_int_pairs(file_name, 'membership', use_cache, threads)
+
+
+def read_networkx_graph(file_name, use_cache=True, threads=None):
+    import networkx as nx
+    edges = load_edge_list(file_name, use_cache, threads)
+    net = nx.Graph()
+    net.add_edges_from(edges.tolist())
+    return net
+
+
+def membership_dict(node_ids, membership_pairs):
+    nodes = np.asarray(membership_pairs[:, 0])
+    labels = np.asarray(membership_pairs[:, 1])
+    keep = np.isin(nodes, node_ids)
+    return dict(zip(nodes[keep].tolist(), labels[keep].tolist()))
@@ -2,53 +2,327 @@ import multiprocessing as mp
 import subprocess
 import sys
 import json
+import csv
+import time
 import argparse
+import math
 import os
+from profiling import profiler, profile_path, maxrss_mb, peak_rss_mb
 
 
-def gen_lfr(stats_path, lfr_path, cmin):
-    with open(stats_path) as f:
-        net_cluster_stats = json.load(f)
-    base_path = os.getcwd()
-    lfr_net_dir = stats_path.replace('.json', '')+"_lfr_"+cmin
-    if not os.path.exists(lfr_net_dir):
-        os.system('mkdir ' + lfr_net_dir)
-    os.chdir(lfr_net_dir)
-    if int(cmin) > net_cluster_stats['max-cluster-size']:
-        return
-    if net_cluster_stats['node-count'] > 5000000:
+DEFAULT_RELAXATION = {'minc': 1.5, 'maxc': 0.8, 'maxk': 0.8}
+
+
+def lfr_params(net_cluster_stats, cmin, clamp=True):
+    # clamp=False skips the downscaling and caps that only exist to keep the LFR binary tractable
+    net_cluster_stats = dict(net_cluster_stats)
+    if clamp and net_cluster_stats['node-count'] > 5000000:
         ratio = net_cluster_stats['node-count'] / 3000000
         net_cluster_stats['node-count'] = 3000000
         net_cluster_stats['max-degree'] = int(net_cluster_stats['max-degree'] / ratio)
         net_cluster_stats['max-cluster-size'] = int(net_cluster_stats['max-cluster-size'] / ratio)
         net_cluster_stats['max-cluster-size'] = 1000
-    if net_cluster_stats['mean-degree'] < 4:
+    if clamp and net_cluster_stats['mean-degree'] < 4:
         net_cluster_stats['max-degree'] = 31
-    if net_cluster_stats['max-degree'] > 1000:
+    if clamp and net_cluster_stats['max-degree'] > 1000:
        net_cluster_stats['max-degree'] = 1000
-    if net_cluster_stats['max-cluster-size'] > 5000:
+    if clamp and net_cluster_stats['max-cluster-size'] > 5000:
        net_cluster_stats['max-cluster-size'] = 5000
-    if net_cluster_stats['mean-degree'] > 50:
+    if clamp and net_cluster_stats['mean-degree'] > 50:
        net_cluster_stats['max-cluster-size'] = 1000
-    cmd = base_path+'/'+lfr_path+ ' -N ' + str(net_cluster_stats['node-count']) \
-                            + ' -k ' + str(net_cluster_stats['mean-degree']) \
-                            + ' -maxk ' + str(net_cluster_stats['max-degree']) \
-                            + ' -mu ' + str(net_cluster_stats['mixing-parameter']) \
-                            + ' -maxc ' + str(net_cluster_stats['max-cluster-size']) \
-                            + ' -minc ' + cmin \
-                            + ' -t1 ' + str(net_cluster_stats['tau1']) \
-                            + ' -t2 ' + str(net_cluster_stats['tau2'])
-    print(cmd)
-    os.system(cmd)
+    return {'N': net_cluster_stats['node-count'],
+            'k': net_cluster_stats['mean-degree'],
+            'maxk': net_cluster_stats['max-degree'],
+            'mu': net_cluster_stats['mixing-parameter'],
+            'maxc': net_cluster_stats['max-cluster-size'],
+            'minc': cmin,
+            't1': net_cluster_stats['tau1'],
+            't2': net_cluster_stats['tau2']}
+
+
+def lfr_command(lfr_path, params):
+    cmd = [os.path.abspath(lfr_path)]
+    for flag in ['N', 'k', 'maxk', 'mu', 'maxc', 'minc', 't1', 't2']:
+        cmd += ['-' + flag, str(params[flag])]
+    return cmd
+
+
+def relax_params(params, attempt, relaxation):
+    # each retry raises cmin and lowers maxc/maxk by another factor, keeping minc <= maxc and k < maxk
+    params = dict(params)
+    if attempt == 0:
+        return params
+    params['minc'] = str(int(math.ceil(int(params['minc']) * relaxation.get('minc', 1) ** attempt)))
+    params['maxc'] = max(int(params['maxc'] * relaxation.get('maxc', 1) ** attempt), int(params['minc']))
+    params['maxk'] = max(int(params['maxk'] * relaxation.get('maxk', 1) ** attempt), int(math.ceil(params['k'])) + 1)
+    return params
+
+
+def run_lfr(cmd, lfr_net_dir, seed=None, log_path=None, timeout=None):
+    # runs in its own working directory so that several jobs can run at once
+    if seed is not None:
+        with open(os.path.join(lfr_net_dir, 'time_seed.dat'), 'w') as f:
+            f.write(str(seed))
+    start = time.time()
+    timed_out = False
+    log = open(log_path, 'a') if log_path else None
+    try:
+        if log:
+            log.write(' '.join(cmd) + '\n')
+            log.flush()
+        proc = subprocess.Popen(cmd, cwd=lfr_net_dir, stdout=log, stderr=subprocess.STDOUT if log else None)
+        # wait4 gives the resource usage of this child alone
+        while True:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG if timeout and not timed_out else 0)
+            if pid:
+                break
+            if time.time() - start > timeout:
+                proc.kill()
+                timed_out = True
+            else:
+                time.sleep(min(1.0, timeout / 100))
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        if log:
+            log.close()
+    return {'returncode': proc.returncode, 'wall_time': time.time() - start, 'peak_rss_mb': maxrss_mb(rusage),
+            'timed_out': timed_out}
+
+
+def run_lfr_with_retries(lfr_path, params, lfr_net_dir, seed=None, log_path=None, timeout=None, retries=0,
+                         relaxation=None):
+    relaxation = DEFAULT_RELAXATION if relaxation is None else relaxation
+    attempts = []
+    for attempt in range(retries + 1):
+        attempt_params = relax_params(params, attempt, relaxation)
+        cmd = lfr_command(lfr_path, attempt_params)
+        if not log_path:
+            print(' '.join(cmd))
+            sys.stdout.flush()
+        result = run_lfr(cmd, lfr_net_dir, seed, log_path, timeout)
+        result.update(attempt=attempt, params=attempt_params)
+        attempts.append(result)
+        if lfr_succeeded(lfr_net_dir, result['returncode']):
+            break
+        print('attempt %d in %s failed (returncode=%d%s)' %
+              (attempt, lfr_net_dir, result['returncode'], ', timed out' if result['timed_out'] else ''))
+        sys.stdout.flush()
+    with open(os.path.join(lfr_net_dir, 'attempts.json'), 'w') as f:
+        f.write(json.dumps(attempts, indent=4))
+    return attempts
+
+
+def convert_lfr_output(lfr_net_dir, output_format='text'):
+    # replaces network.dat / community.dat by int32 arrays that downstream scripts memory-map (npy) or load (npz)
+    from fast_io import parse_int_pairs, save_binary_pairs
+    if output_format == 'text':
+        return
+    for name in ['network', 'community']:
+        text_path = os.path.join(lfr_net_dir, name + '.dat')
+        save_binary_pairs(os.path.join(lfr_net_dir, name), parse_int_pairs(text_path), output_format == 'npz')
+        os.remove(text_path)
+
+
+def lfr_succeeded(lfr_net_dir, returncode):
+    return returncode == 0 and os.path.exists(os.path.join(lfr_net_dir, 'network.dat'))
+
+
+def run_native(params, lfr_net_dir, seed=None, output_format='text'):
+    from lfr_native import generate_lfr, write_lfr_text, write_lfr_binary
+    start = time.time()
+    with profiler.stage('generate'):
+        edges, membership = generate_lfr(params, seed)
+    with profiler.stage('write'):
+        if output_format == 'text':
+            write_lfr_text(lfr_net_dir, edges, membership)
+        else:
+            write_lfr_binary(lfr_net_dir, edges, membership, output_format == 'npz')
+    # peak of this process so far, which includes the generator
+    return {'returncode': 0, 'wall_time': time.time() - start, 'peak_rss_mb': peak_rss_mb(), 'timed_out': False,
+            'attempt': 0, 'params': params, 'edge-count': len(edges)}
+
+
+def gen_lfr(stats_path, lfr_path, cmin, timeout=None, retries=0, relaxation=None, backend='binary', seed=None,
+            output_format='text'):
+    with profiler.stage('read_stats'):
+        with open(stats_path) as f:
+            net_cluster_stats = json.load(f)
+    lfr_net_dir = stats_path.replace('.json', '')+"_lfr_"+cmin
+    os.makedirs(lfr_net_dir, exist_ok=True)
+    if int(cmin) > net_cluster_stats['max-cluster-size']:
+        return True
+    if backend == 'native':
+        params = lfr_params(net_cluster_stats, cmin, clamp=False)
+        print('native LFR generator:', params)
+        with profiler.stage('native'):
+            result = run_native(params, lfr_net_dir, seed, output_format)
+        print('network of %d vertices and %d edges generated in %.1fs' %
+              (params['N'], result['edge-count'], result['wall_time']))
+        return True
+    params = lfr_params(net_cluster_stats, cmin)
+    if not timeout and not retries:
+        cmd = lfr_command(lfr_path, params)
+        print(' '.join(cmd))
+        sys.stdout.flush()
+        with profiler.stage('lfr'):
+            returncode = run_lfr(cmd, lfr_net_dir)['returncode']
+    else:
+        with profiler.stage('lfr'):
+            returncode = run_lfr_with_retries(lfr_path, params, lfr_net_dir, timeout=timeout, retries=retries,
+                                              relaxation=relaxation)[-1]['returncode']
+    if not lfr_succeeded(lfr_net_dir, returncode):
+        print('LFR generation failed in', lfr_net_dir)
+        return False
+    with profiler.stage('convert'):
+        convert_lfr_output(lfr_net_dir, output_format)
+    return True
+
+
+def load_catalogue(catalogue_path):
+    with open(catalogue_path) as f:
+        for row in csv.DictReader(f):
+            stats = {}
+            for key, value in row.items():
+                try:
+                    stats[key] = int(value)
+                except ValueError:
+                    try:
+                        stats[key] = float(value)
+                    except ValueError:
+                        stats[key] = value
+            yield row['name'].replace('.tsv', ''), stats
+
+
+def sweep_jobs(stats_paths, catalogue_path, out_dir, lfr_path, cmins, seeds, backend='binary', output_format='text'):
+    networks = []
+    for stats_path in stats_paths:
+        with open(stats_path) as f:
+            networks.append((stats_path.replace('.json', ''), json.load(f)))
+    if catalogue_path:
+        networks += [(os.path.join(out_dir, name), stats) for name, stats in load_catalogue(catalogue_path)]
+    jobs = []
+    for base, stats in networks:
+        for cmin in cmins:
+            if int(cmin) > stats['max-cluster-size']:
+                print('skipping', base, 'cmin', cmin, '(larger than max-cluster-size)')
+                continue
+            for seed in seeds:
+                lfr_net_dir = base + "_lfr_" + cmin + ('' if seed is None else '_s' + str(seed))
+                jobs.append({'dir': lfr_net_dir, 'seed': seed, 'lfr_path': lfr_path, 'backend': backend,
+                             'output_format': output_format,
+                             'params': lfr_params(stats, cmin, clamp=backend != 'native')})
+    return jobs
+
+
+def run_sweep_job(job):
+    # a job that cannot run (e.g. a missing LFR binary, or an OSError while converting its output) is reported as
+    # failed instead of aborting the sweep
+    start = time.time()
+    try:
+        return sweep_job(job)
+    except Exception as e:
+        return dict(job, returncode=-1, attempt=0, timed_out=False, wall_time=time.time() - start,
+                    peak_rss_mb=peak_rss_mb(), error='%s: %s' % (type(e).__name__, e))
+
+
+def sweep_job(job):
+    os.makedirs(job['dir'], exist_ok=True)
+    if job.get('backend') == 'native':
+        return dict(job, **run_native(job['params'], job['dir'], job['seed'], job.get('output_format', 'text')))
+    attempts = run_lfr_with_retries(job['lfr_path'], job['params'], job['dir'], job['seed'],
+                                    os.path.join(job['dir'], 'lfr.log'), job.get('timeout'), job.get('retries', 0),
+                                    job.get('relaxation'))
+    last = attempts[-1]
+    if lfr_succeeded(job['dir'], last['returncode']):
+        convert_lfr_output(job['dir'], job.get('output_format', 'text'))
+    return dict(job, returncode=last['returncode'], attempt=last['attempt'], timed_out=last['timed_out'],
+                wall_time=sum(a['wall_time'] for a in attempts), peak_rss_mb=max(a['peak_rss_mb'] for a in attempts))
+
+
+def run_sweep(jobs, processes, report_path=None, timeout=None, retries=0, relaxation=None):
+    jobs = [dict(job, timeout=timeout, retries=retries, relaxation=relaxation) for job in jobs]
+    results = []
+    # one worker per job, so that the peak memory reported by the native generator is that job's own
+    with mp.Pool(processes, maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(run_sweep_job, jobs):
+            print('%s\treturncode=%d\tattempt=%d\twall_time=%.1fs\tpeak_rss=%.1fMB%s' %
+                  (result['dir'], result['returncode'], result['attempt'], result['wall_time'],
+                   result['peak_rss_mb'], '\terror=' + result['error'] if 'error' in result else ''))
+            sys.stdout.flush()
+            results.append(result)
+    if report_path:
+        with open(report_path, 'w') as f:
+            f.write('dir\tseed\treturncode\tattempt\ttimed_out\twall_time\tpeak_rss_mb\terror\n')
+            for r in results:
+                f.write('%s\t%s\t%d\t%d\t%s\t%f\t%f\t%s\n' % (r['dir'], r['seed'], r['returncode'], r['attempt'],
+                                                              r['timed_out'], r['wall_time'], r['peak_rss_mb'],
+                                                              r.get('error', '')))
+    return results
+
+
+def parse_relaxation(specs):
+    relaxation = dict(DEFAULT_RELAXATION)
+    for spec in specs or []:
+        key, value = spec.split('=')
+        if key not in DEFAULT_RELAXATION:
+            raise ValueError('unknown relaxation parameter: ' + key)
+        relaxation[key] = float(value)
+    return relaxation
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Emulating real networks using LFR graphs.')
-    parser.add_argument('-n', metavar='net', type=str, required=True,
-                        help='network clustering statistics file path (json format)')
-    parser.add_argument('-lp', metavar='lfrpath', type=str, required=True,
-                        help='LFR software executable path (benchmark)')
-    parser.add_argument('-cm', metavar='cmin', type=str, required=False,
-                        help='Minimum community size')
+    parser.add_argument('-n', metavar='net', type=str, nargs='+', default=[],
+                        help='network clustering statistics file path(s) (json format)')
+    parser.add_argument('-lp', metavar='lfrpath', type=str, required=False,
+                        help='LFR software executable path (benchmark); required with the binary backend')
+    parser.add_argument('-cm', metavar='cmin', type=str, nargs='+', required=False,
+                        help='Minimum community size(s)')
+    parser.add_argument('--catalogue', type=str, required=False,
+                        help='CSV of network statistics (e.g. data_characteristics/network_params_lfr.csv) '
+                             'to emulate every row of')
+    parser.add_argument('-o', metavar='outdir', type=str, default='.',
+                        help='directory for the LFR outputs of catalogue rows')
+    parser.add_argument('--seeds', type=int, nargs='+', required=False,
+                        help='LFR random seeds; one emulation is generated per seed')
+    parser.add_argument('-p', metavar='processes', type=int, default=1,
+                        help='maximum number of LFR jobs running at once')
+    parser.add_argument('--report', type=str, required=False,
+                        help='TSV file for per-job wall time and peak memory')
+    parser.add_argument('--timeout', type=float, required=False,
+                        help='wall-clock budget in seconds for each LFR attempt; stalled runs are killed')
+    parser.add_argument('--retries', type=int, default=0,
+                        help='number of retries with relaxed parameters after a failed or timed-out attempt')
+    parser.add_argument('--relax', type=str, nargs='+', required=False,
+                        help='per-retry relaxation factors, e.g. minc=1.5 maxc=0.8 maxk=0.8 (the defaults)')
+    parser.add_argument('--backend', type=str, choices=['binary', 'native'], default='binary',
+                        help='run the LFR binary (default) or the in-process NumPy generator, which needs no '
+                             'downscaling of large networks')
+    parser.add_argument('--output-format', type=str, choices=['text', 'npy', 'npz'], default='text',
+                        help='keep network.dat/community.dat as text (default) or convert them once to int32 arrays: '
+                             'network.npy/community.npy, memory-mapped by the estimator and lfr_accuracy.py, or '
+                             'compressed network.npz/community.npz')
+    parser.add_argument('--profile', metavar='path', type=str, nargs='?', const='',
+                        help='write per-stage wall time, cpu time and memory as JSON (default path: next to the first '
+                             'input, <net>.lfr-profile.json); the LFR binary shows up in children_peak_rss_mb')
     args = parser.parse_args()
-    gen_lfr(args.n, args.lp, args.cm if args.cm else str(1))
+    if args.profile is not None:
+        profiler.enable()
+    if args.backend == 'binary' and not args.lp:
+        parser.error('-lp is required with the binary backend')
+    cmins = args.cm if args.cm else [str(1)]
+    relaxation = parse_relaxation(args.relax)
+    succeeded = True
+    if len(args.n) == 1 and not args.catalogue and len(cmins) == 1 and not args.seeds and not args.report:
+        succeeded = gen_lfr(args.n[0], args.lp, cmins[0], args.timeout, args.retries, relaxation, args.backend,
+                            output_format=args.output_format)
+    else:
+        jobs = sweep_jobs(args.n, args.catalogue, args.o, args.lp, cmins, args.seeds or [None], args.backend,
+                          args.output_format)
+        with profiler.stage('sweep'):
+            run_sweep(jobs, args.p, args.report, args.timeout, args.retries, relaxation)
+    if args.profile is not None:
+        profiler.write(args.profile or profile_path(args.n[0] if args.n else args.catalogue, 'lfr-profile'))
+    if not succeeded:
+        # every attempt failed; callers such as pipeline.py check the exit status
+        sys.exit(1)
@@ -0,0 +1,218 @@
+import os
+import importlib.util
+import numpy as np
+from collections import defaultdict
+from fast_io import read_networkx_graph, load_edge_list, load_membership, membership_dict, is_binary_pairs
+from network_arrays import graph_to_arrays, encode_membership, mixing_param_from_arrays, modularity_from_arrays
+
+
+# edge-list sizes at which --backend auto moves to the next backend
+AUTO_NETWORKX_BYTES = 64 * 1024 * 1024
+AUTO_NETWORKIT_BYTES = 1024 * 1024 * 1024
+
+
+def compact_edges(pairs):
+    # relabels arbitrary integer node ids to 0..n-1 and keeps each undirected edge once (self-loops included)
+    node_ids, positions = np.unique(pairs, return_inverse=True)
+    positions = positions.reshape(-1, 2)
+    n = len(node_ids)
+    keys = np.unique(positions.min(axis=1).astype(np.int64) * n + positions.max(axis=1))
+    return node_ids, keys // n, keys % n
+
+
+def read_compact_edges(file_name, cache=False):
+    return compact_edges(np.asarray(load_edge_list(file_name, use_cache=cache)))
+
+
+class GraphBackend:
+    # a loaded graph plus everything the estimator asks of it; node_ids are the ids used in the input files, and
+    # edge arrays hold positions into node_ids
+
+    name = None
+
+    def __init__(self, node_ids=None, src=None, dst=None):
+        self.arrays = None if node_ids is None else (node_ids, src, dst)
+
+    def node_ids(self):
+        return self.edge_arrays()[0]
+
+    def node_count(self):
+        return len(self.node_ids())
+
+    def edge_arrays(self):
+        return self.arrays
+
+    def read_membership(self, file_name, cache=False):
+        return membership_dict(self.node_ids(), load_membership(file_name, use_cache=cache))
+
+    def labels(self, membership):
+        return encode_membership(self.node_ids(), membership)
+
+    def mixing_param_edges(self, membership):
+        nodes, src, dst = self.edge_arrays()
+        return mixing_param_from_arrays(src, dst, self.labels(membership))
+
+    def modularity_edges(self, membership):
+        nodes, src, dst = self.edge_arrays()
+        return modularity_from_arrays(src, dst, self.labels(membership))
+
+    def network_statistics(self, components=True):
+        # node count, edge count, degree per node, isolate count, connected component sizes (None when not asked for);
+        # a self-loop adds two to its node's degree, as in networkx
+        node_ids, src, dst = self.edge_arrays()
+        n = len(node_ids)
+        degrees = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+        if not components:
+            return n, len(src), degrees, int(np.sum(degrees == 0)), None
+        import scipy.sparse as sp
+        from scipy.sparse.csgraph import connected_components
+        adj = sp.csr_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n))
+        _, labels = connected_components(adj, directed=False)
+        return n, len(src), degrees, int(np.sum(degrees == 0)), np.bincount(labels)
+
+    def parallel_network_statistics(self, processes, components=True):
+        # same results as network_statistics, computed from the edge arrays on several cores
+        from parallel_stats import parallel_network_statistics
+        nodes, src, dst = self.edge_arrays()
+        return parallel_network_statistics(len(nodes), src, dst, processes, components)
+
+
+class NetworkXBackend(GraphBackend):
+    name = 'networkx'
+
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+
+    @classmethod
+    def read(cls, file_name, cache=False):
+        import networkx as nx
+        if cache or is_binary_pairs(file_name):
+            return cls(read_networkx_graph(file_name, use_cache=cache))
+        return cls(nx.read_edgelist(file_name, nodetype=int))
+
+    def node_ids(self):
+        return list(self.net.nodes)
+
+    def node_count(self):
+        return self.net.number_of_nodes()
+
+    def edge_arrays(self):
+        if self.arrays is None:
+            self.arrays = graph_to_arrays(self.net)
+        return self.arrays
+
+    def read_membership(self, file_name, cache=False):
+        if cache or is_binary_pairs(file_name):
+            return membership_dict(self.node_ids(), load_membership(file_name, use_cache=cache))
+        membership = dict()
+        with open(file_name) as f:
+            for line in f:
+                i, m = line.strip().split()
+                if int(i) in self.net.nodes:
+                    membership[int(i)] = m
+        return membership
+
+    def mixing_param_edges(self, membership):
+        in_degree = defaultdict(int)
+        out_degree = defaultdict(int)
+        for n1, n2 in self.net.edges:
+            if membership[n1] == membership[n2]: # nodes are co-clustered
+                in_degree[n1] += 1
+                in_degree[n2] += 1
+            else:
+                out_degree[n1] += 1
+                out_degree[n2] += 1
+        mus = [out_degree[i]/(out_degree[i]+in_degree[i]) if (out_degree[i]+in_degree[i]) != 0 else 0
+               for i in self.net.nodes]
+        return np.mean(mus)
+
+    def modularity_edges(self, membership):
+        from networkx.algorithms.community import modularity
+        partition = defaultdict(list)
+        for node, cluster in membership.items():
+            partition[cluster].append(node)
+        return modularity(self.net, partition.values())
+
+    def network_statistics(self, components=True):
+        import networkx as nx
+        graph = self.net
+        isolate_count = len(list(nx.isolates(graph)))
+        connected_components_sizes = [len(c) for c in nx.connected_components(graph)] if components else None
+        degrees = [d for _, d in graph.degree()]
+        return graph.number_of_nodes(), graph.number_of_edges(), degrees, isolate_count, connected_components_sizes
+
+
+class NetworKitBackend(GraphBackend):
+    # the NetworKit graph is built over compact positions, so input ids need not be 0..n-1
+    name = 'networkit'
+
+    def __init__(self, net, node_ids, src, dst):
+        super().__init__(node_ids, src, dst)
+        self.net = net
+
+    @classmethod
+    def read(cls, file_name, cache=False):
+        import networkit as nk
+        node_ids, src, dst = read_compact_edges(file_name, cache)
+        net = nk.Graph(len(node_ids))
+        net.addEdges((src.astype(np.uint64), dst.astype(np.uint64)))
+        return cls(net, node_ids, src, dst)
+
+    def mixing_param_edges(self, membership):
+        node_ids = self.node_ids()
+        in_degree = defaultdict(int)
+        out_degree = defaultdict(int)
+        for n1, n2 in self.net.iterEdges():
+            if membership[node_ids[n1]] == membership[node_ids[n2]]: # nodes are co-clustered
+                in_degree[n1] += 1
+                in_degree[n2] += 1
+            else:
+                out_degree[n1] += 1
+                out_degree[n2] += 1
+        mus = [out_degree[i]/(out_degree[i]+in_degree[i]) if (out_degree[i]+in_degree[i]) != 0 else 0
+               for i in self.net.iterNodes()]
+        return np.mean(mus)
+
+    def network_statistics(self, components=True):
+        graph = self.net
+        connected_components_sizes = None
+        if components:
+            import networkit as nk
+            cc = nk.components.ConnectedComponents(graph)
+            cc.run()
+            connected_components_sizes = list(cc.getComponentSizes().values())
+        # degrees from the edge arrays so that self-loops count twice, as on the other backends
+        node_ids, src, dst = self.edge_arrays()
+        degrees = np.bincount(src, minlength=len(node_ids)) + np.bincount(dst, minlength=len(node_ids))
+        return graph.numberOfNodes(), graph.numberOfEdges(), degrees, int(np.sum(degrees == 0)), \
+               connected_components_sizes
+
+
+class ArrayBackend(GraphBackend):
+    # pure NumPy/SciPy: the edge arrays are the graph, and every statistic comes from GraphBackend
+    name = 'csr'
+
+    @classmethod
+    def read(cls, file_name, cache=False):
+        return cls(*read_compact_edges(file_name, cache))
+
+
+BACKENDS = {backend.name: backend for backend in (NetworkXBackend, NetworKitBackend, ArrayBackend)}
+
+
+def choose_backend(file_name, backend='auto'):
+    if backend != 'auto':
+        return BACKENDS[backend]
+    size = os.path.getsize(file_name)
+    if size < AUTO_NETWORKX_BYTES:
+        return NetworkXBackend
+    if size < AUTO_NETWORKIT_BYTES and importlib.util.find_spec('networkit') is not None:
+        return NetworKitBackend
+    return ArrayBackend
+
+
+def read_graph(file_name, backend='auto', cache=False):
+    backend_class = choose_backend(file_name, backend)
+    print('backend:', backend_class.name)
+    return backend_class.read(file_name, cache)
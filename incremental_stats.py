@@ -0,0 +1,173 @@
+import os
+import json
+import shutil
+import numpy as np
+from fast_io import load_membership, stats_path
+
+
+# arrays that do not change when the clustering does; new states link to them instead of copying
+GRAPH_ARRAYS = ('node_ids', 'indptr', 'indices')
+CLUSTERING_ARRAYS = ('labels', 'in_degree', 'cluster_ids', 'cluster_codes', 'cluster_size', 'cluster_degree',
+                     'size_counts')
+
+
+def state_path(clustering_path):
+    # where the incremental state of a clustering is kept: a directory next to its statistics JSON
+    return os.path.splitext(stats_path(clustering_path))[0] + '.state'
+
+
+def build_state(node_ids, src, dst, membership):
+    # node_ids are sorted so that diffs can be looked up with searchsorted; the adjacency is symmetric CSR with a
+    # self-loop stored twice, so a row holds one entry per unit of degree
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+    order = np.argsort(node_ids)
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    src, dst = position[src], position[dst]
+    n = len(node_ids)
+    rows, columns = np.concatenate([src, dst]), np.concatenate([dst, src])
+    indices = columns[np.lexsort((columns, rows))]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))]).astype(np.int64)
+    node_ids = node_ids[order]
+    raw = np.array([membership[v] for v in node_ids.tolist()]).astype(np.int64)
+    cluster_ids, labels = np.unique(raw, return_inverse=True)
+    labels = labels.ravel().astype(np.int64, copy=False)
+    degrees = np.diff(indptr)
+    in_degree = np.bincount(np.repeat(np.arange(n), degrees)[labels[indices] == np.repeat(labels, degrees)],
+                            minlength=n)
+    cluster_size = np.bincount(labels, minlength=len(cluster_ids))
+    cluster_degree = np.bincount(labels, weights=degrees, minlength=len(cluster_ids)).astype(np.int64)
+    mus = np.divide(degrees - in_degree, degrees, out=np.zeros(n), where=degrees != 0)
+    arrays = {'node_ids': node_ids, 'indptr': indptr, 'indices': indices, 'labels': labels, 'in_degree': in_degree,
+              'cluster_ids': cluster_ids, 'cluster_codes': np.arange(len(cluster_ids)), 'cluster_size': cluster_size,
+              'cluster_degree': cluster_degree, 'size_counts': np.bincount(cluster_size)}
+    totals = {'two-m': int(degrees.sum()), 'in-degree-sum': int(in_degree.sum()),
+              'degree-square-sum': sum(d * d for d in cluster_degree.tolist()), 'mu-sum': float(mus.sum())}
+    return arrays, totals
+
+
+def save_state(path, arrays, totals, previous_path=None):
+    # the graph arrays of a state derived from another one are hard links to the previous files
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        target = os.path.join(path, name + '.npy')
+        if previous_path is not None and name in GRAPH_ARRAYS:
+            if os.path.abspath(path) == os.path.abspath(previous_path):
+                continue
+            source = os.path.join(previous_path, name + '.npy')
+            if os.path.exists(target):
+                os.remove(target)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copyfile(source, target)
+            continue
+        np.save(target + '.tmp.npy', array)
+        os.replace(target + '.tmp.npy', target)
+    with open(os.path.join(path, 'totals.json'), 'w') as f:
+        f.write(json.dumps(totals, indent=4))
+
+
+def load_state(path):
+    # copy-on-write memory maps: only the pages an update touches are read
+    arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if name in GRAPH_ARRAYS else 'c')
+              for name in GRAPH_ARRAYS + CLUSTERING_ARRAYS}
+    with open(os.path.join(path, 'totals.json')) as f:
+        return arrays, json.load(f)
+
+
+def read_diff(diff_path, node_ids):
+    # node positions and new cluster ids; ids missing from the network are dropped and a later line for the same
+    # node overrides an earlier one
+    pairs = np.asarray(load_membership(diff_path, use_cache=False))
+    nodes, clusters = pairs[::-1, 0], pairs[::-1, 1]
+    nodes, first = np.unique(nodes, return_index=True)
+    clusters = clusters[first]
+    positions = np.minimum(np.searchsorted(node_ids, nodes), max(len(node_ids) - 1, 0))
+    found = node_ids[positions] == nodes if len(node_ids) else np.zeros(len(nodes), dtype=bool)
+    return positions[found], clusters[found]
+
+
+def cluster_codes_for(arrays, clusters):
+    # codes of the given cluster ids; ids seen for the first time get new codes at the end of the cluster arrays
+    cluster_ids, cluster_codes = arrays['cluster_ids'], arrays['cluster_codes']
+    new_ids = np.setdiff1d(clusters, cluster_ids)
+    if len(new_ids):
+        new_codes = len(arrays['cluster_size']) + np.arange(len(new_ids))
+        at = np.searchsorted(cluster_ids, new_ids)
+        arrays['cluster_ids'] = cluster_ids = np.insert(cluster_ids, at, new_ids)
+        arrays['cluster_codes'] = cluster_codes = np.insert(cluster_codes, at, new_codes)
+        for name in ('cluster_size', 'cluster_degree'):
+            arrays[name] = np.concatenate([arrays[name], np.zeros(len(new_ids), dtype=arrays[name].dtype)])
+        arrays['size_counts'][0] += len(new_ids)
+    return cluster_codes[np.searchsorted(cluster_ids, clusters)]
+
+
+def apply_diff(arrays, totals, positions, clusters):
+    # moves the given nodes and updates every aggregate from the rows of the moved nodes only, so the cost is
+    # proportional to their total degree
+    labels, in_degree, indptr, indices = arrays['labels'], arrays['in_degree'], arrays['indptr'], arrays['indices']
+    new = cluster_codes_for(arrays, clusters)
+    moved = labels[positions] != new
+    positions, new = positions[moved], new[moved]
+    if len(positions) == 0:
+        return 0
+    old = labels[positions].copy()
+    degrees = indptr[positions + 1] - indptr[positions]
+    owner = np.repeat(np.arange(len(positions)), degrees)
+    rows = indptr[positions][owner] + np.arange(len(owner)) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+    neighbors = indices[rows]
+
+    # nodes whose share of out-edges changes: the moved nodes and their neighbours
+    touched = np.unique(np.concatenate([positions, neighbors]))
+    touched_degree = indptr[touched + 1] - indptr[touched]
+
+    def mu_sum(nodes, node_degrees):
+        return float(np.sum(np.divide(node_degrees - in_degree[nodes], node_degrees, out=np.zeros(len(nodes)),
+                                      where=node_degrees != 0)))
+
+    before = mu_sum(touched, touched_degree)
+    in_before = int(in_degree[touched].sum())
+    labels[positions] = new
+    # unchanged neighbours gain or lose one co-clustered edge per entry; moved nodes are recounted from their rows
+    unchanged = ~np.isin(neighbors, positions)
+    gain = (new[owner] == labels[neighbors]).astype(np.int64) - (old[owner] == labels[neighbors])
+    np.add.at(in_degree, neighbors[unchanged], gain[unchanged])
+    in_degree[positions] = np.bincount(owner, weights=labels[neighbors] == new[owner],
+                                       minlength=len(positions)).astype(np.int64)
+    totals['mu-sum'] += mu_sum(touched, touched_degree) - before
+    totals['in-degree-sum'] += int(in_degree[touched].sum()) - in_before
+
+    size, degree, size_counts = arrays['cluster_size'], arrays['cluster_degree'], arrays['size_counts']
+    changed = np.unique(np.concatenate([old, new]))
+    totals['degree-square-sum'] -= sum(d * d for d in degree[changed].tolist())
+    np.subtract.at(size_counts, size[changed], 1)
+    np.add.at(size, old, -1)
+    np.add.at(size, new, 1)
+    np.add.at(degree, old, -degrees)
+    np.add.at(degree, new, degrees)
+    totals['degree-square-sum'] += sum(d * d for d in degree[changed].tolist())
+    if size[changed].max() >= len(size_counts):
+        size_counts = np.concatenate([size_counts, np.zeros(size[changed].max() + 1 - len(size_counts),
+                                                            dtype=size_counts.dtype)])
+    np.add.at(size_counts, size[changed], 1)
+    arrays['size_counts'] = size_counts
+    return len(positions)
+
+
+def update_statistics(previous_clustering, diff_path, clustering_path):
+    # moves the nodes listed in diff_path from the clustering of previous_clustering, saves the state of
+    # clustering_path and returns the number of moved nodes, node count, cluster sizes, mu and modularity
+    previous_state = state_path(previous_clustering)
+    arrays, totals = load_state(previous_state)
+    positions, clusters = read_diff(diff_path, arrays['node_ids'])
+    moved = apply_diff(arrays, totals, positions, clusters)
+    save_state(state_path(clustering_path), arrays, totals, previous_state)
+
+    node_count = len(arrays['labels'])
+    size_counts = arrays['size_counts']
+    cluster_sizes = np.repeat(np.arange(len(size_counts)), size_counts)[size_counts[0]:]
+    two_m = totals['two-m']
+    modularity_score = float('nan') if two_m == 0 else \
+        totals['in-degree-sum'] / two_m - totals['degree-square-sum'] / two_m ** 2
+    return moved, node_count, cluster_sizes, totals['mu-sum'] / node_count, modularity_score
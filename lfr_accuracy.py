@@ -1,6 +1,11 @@
-from sklearn.metrics.cluster import normalized_mutual_info_score, adjusted_mutual_info_score, adjusted_rand_score
 import numpy as np
 import argparse
+import csv
+import json
+import sys
+import multiprocessing as mp
+from profiling import profiler, profile_path
+from fast_io import is_binary_pairs, load_binary_pairs, load_membership
 
 def membership_to_partition(membership):
     part_dict = {}
@@ -12,22 +17,23 @@ def membership_to_partition(membership):
     return list(part_dict.values())
 
 
-def get_membership_list_shared_nodes(gt_path, f1_path, f2_path):
-    gt_membership = dict()
-    membership1 = dict()
-    membership2 = dict()
-    with open(gt_path) as fgt:
-        for line in fgt:
-            i, m = line.strip().split()
-            gt_membership[int(i)] = m
-    with open(f1_path) as f1:
-        for line in f1:
+def read_membership(file_name):
+    if is_binary_pairs(file_name):
+        # labels as strings, like the text reader, so they stay distinct from the integer ids of added singletons
+        pairs = load_binary_pairs(file_name)
+        return dict(zip(pairs[:, 0].tolist(), map(str, pairs[:, 1].tolist())))
+    membership = dict()
+    with open(file_name) as f:
+        for line in f:
             i, m = line.strip().split()
-            membership1[int(i)] = m
-    with open(f2_path) as f2:
-        for line in f2:
-            i, m = line.strip().split()
-            membership2[int(i)] = m
+            membership[int(i)] = m
+    return membership
+
+
+def get_membership_list_shared_nodes(gt_path, f1_path, f2_path):
+    gt_membership = read_membership(gt_path)
+    membership1 = read_membership(f1_path)
+    membership2 = read_membership(f2_path)
     print('#nodes in ground-truth:', len(gt_membership.keys()))
     print('#nodes in pre-CM partition:', len(membership1.keys()))
     print('#nodes in post-CM partition:', len(membership2.keys()))
@@ -41,21 +47,9 @@ def get_membership_list_shared_nodes(gt_path, f1_path, f2_path):
 
 
 def get_membership_list_add_singletons(gt_path, f1_path, f2_path):
-    gt_membership = dict()
-    membership1 = dict()
-    membership2 = dict()
-    with open(gt_path) as fgt:
-        for line in fgt:
-            i, m = line.strip().split()
-            gt_membership[int(i)] = m
-    with open(f1_path) as f1:
-        for line in f1:
-            i, m = line.strip().split()
-            membership1[int(i)] = m
-    with open(f2_path) as f2:
-        for line in f2:
-            i, m = line.strip().split()
-            membership2[int(i)] = m
+    gt_membership = read_membership(gt_path)
+    membership1 = read_membership(f1_path)
+    membership2 = read_membership(f2_path)
     print('#nodes in ground-truth:', len(gt_membership.keys()))
     print('#nodes in pre-CM partition:', len(membership1.keys()))
     print('#nodes in post-CM partition:', len(membership2.keys()))
@@ -78,46 +72,303 @@ def get_membership_list_add_singletons(gt_path, f1_path, f2_path):
     return list(mem_gt.values()), list(mem1.values()), list(mem2.values())
 
 
-def measure_accuracy(mem_true, mem_est):
-    n = len(mem_true)
-    tn, tp, fn, fp = 0, 0, 0, 0
-    for i in range(n):
-        for j in range(i + 1, n):
-            if mem_true[i] == mem_true[j]:
-                if mem_est[i] == mem_est[j]:
-                    tp += 1
-                else:
-                    fn += 1
-            else:
-                if mem_est[i] == mem_est[j]:
-                    fp += 1
-                else:
-                    tn += 1
+def read_membership_arrays(file_name):
+    # node ids sorted, with their integer labels; as with the dict readers, a later line for the same node wins
+    pairs = np.asarray(load_membership(file_name, use_cache=False))[::-1]
+    ids, last = np.unique(pairs[:, 0], return_index=True)
+    return ids, pairs[last, 1]
+
+
+def align_labels(keys, ids, labels):
+    # labels of the sorted keys, looked up in the sorted ids; keys that are missing get fresh singleton labels
+    pos = np.minimum(np.searchsorted(ids, keys), max(len(ids) - 1, 0))
+    found = ids[pos] == keys if len(ids) else np.zeros(len(keys), dtype=bool)
+    _, codes = np.unique(labels, return_inverse=True)
+    aligned = np.empty(len(keys), dtype=np.int64)
+    aligned[found] = codes.ravel()[pos[found]]
+    missing = np.count_nonzero(~found)
+    aligned[~found] = len(labels) + np.arange(missing)
+    _, aligned = np.unique(aligned, return_inverse=True)
+    return aligned.ravel(), missing
+
+
+def get_label_arrays_shared_nodes(gt_path, f1_path, f2_path):
+    gt_ids, gt_labels = read_membership_arrays(gt_path)
+    ids1, labels1 = read_membership_arrays(f1_path)
+    ids2, labels2 = read_membership_arrays(f2_path)
+    print('#nodes in ground-truth:', len(gt_ids))
+    print('#nodes in pre-CM partition:', len(ids1))
+    print('#nodes in post-CM partition:', len(ids2))
+    keys = np.intersect1d(np.intersect1d(ids1, ids2, assume_unique=True), gt_ids, assume_unique=True)
+    print('common nodes between all partitions:', len(keys))
+    return align_labels(keys, gt_ids, gt_labels)[0], align_labels(keys, ids1, labels1)[0], \
+           align_labels(keys, ids2, labels2)[0]
+
+
+def get_label_arrays_add_singletons(gt_path, f1_path, f2_path):
+    gt_ids, gt_labels = read_membership_arrays(gt_path)
+    ids1, labels1 = read_membership_arrays(f1_path)
+    ids2, labels2 = read_membership_arrays(f2_path)
+    print('#nodes in ground-truth:', len(gt_ids))
+    print('#nodes in pre-CM partition:', len(ids1))
+    print('#nodes in post-CM partition:', len(ids2))
+    mem_gt, _ = align_labels(gt_ids, gt_ids, gt_labels)
+    mem1, _ = align_labels(gt_ids, ids1, labels1)
+    mem2, _ = align_labels(gt_ids, ids2, labels2)
+    print('#singletons added to post-CM clustering:', len(np.unique(mem2)) - len(np.unique(labels2)))
+    print(len(gt_ids), len(gt_ids), len(gt_ids))
+    return mem_gt, mem1, mem2
+
+
+def factorize(labels):
+    # integer codes of the labels; lists from the dict readers mix cluster ids and node ids, so they are compared
+    # as Python values rather than converted to a common NumPy dtype
+    if isinstance(labels, np.ndarray):
+        return np.unique(labels, return_inverse=True)[1].ravel()
+    codes = {}
+    return np.fromiter((codes.setdefault(v, len(codes)) for v in labels), dtype=np.int64, count=len(labels))
+
+
+def contingency_table(mem_true, mem_est):
+    true_labels, est_labels = factorize(mem_true), factorize(mem_est)
+    counts = np.ones(len(true_labels), dtype=np.int64)
+    # duplicate (true, est) entries are summed when converting to csr
+    import scipy.sparse as sp
+    return sp.coo_matrix((counts, (true_labels.ravel(), est_labels.ravel()))).tocsr()
+
+
+def comb2(x):
+    x = np.asarray(x, dtype=np.int64)
+    return int(np.sum(x * (x - 1) // 2))
+
+
+def pair_counts(contingency):
+    n = int(contingency.sum())
+    tp = comb2(contingency.data)
+    same_true = comb2(np.ravel(contingency.sum(axis=1)))
+    same_est = comb2(np.ravel(contingency.sum(axis=0)))
+    fn = same_true - tp
+    fp = same_est - tp
+    tn = n * (n - 1) // 2 - tp - fn - fp
+    return tp, fp, fn, tn
+
+
+def entropy_from_sizes(sizes):
+    sizes = np.asarray(sizes, dtype=np.float64)
+    n = sizes.sum()
+    return float(-np.sum((sizes / n) * (np.log(sizes) - np.log(n))))
+
+
+def mutual_information(contingency):
+    # the sum sklearn's mutual_info_score computes from a contingency table, over its non-zero cells
+    coo = contingency.tocoo()
+    n = coo.data.sum()
+    row_sums = np.ravel(contingency.sum(axis=1)).astype(np.float64)
+    col_sums = np.ravel(contingency.sum(axis=0)).astype(np.float64)
+    nij = coo.data.astype(np.float64)
+    mi = np.sum(nij / n * (np.log(nij) + np.log(n) - np.log(row_sums[coo.row]) - np.log(col_sums[coo.col])))
+    return float(max(mi, 0.0))
+
+
+def nmi_from_contingency(contingency):
+    n_true, n_est = contingency.shape
+    if n_true == n_est == 1 or n_true == n_est == 0:
+        return 1.0
+    mi = mutual_information(contingency)
+    if mi == 0:
+        return 0.0
+    h_true = entropy_from_sizes(np.ravel(contingency.sum(axis=1)))
+    h_est = entropy_from_sizes(np.ravel(contingency.sum(axis=0)))
+    return float(mi / np.mean([h_true, h_est]))
+
+
+def grouped_expected_mutual_information(row_sums, col_sums, n, tail_sd=None):
+    # EMI depends only on the cluster sizes, so each pair of distinct sizes is evaluated once and weighted by how
+    # many cluster pairs share it; with tail_sd, the hypergeometric sum over n_ij is cut to the range from tail_sd
+    # standard deviations below the mean to tail_sd * (sd + 1) above it, which drops the tail mass beyond that range
+    from scipy.special import gammaln
+    a_values, a_counts = np.unique(np.asarray(row_sums, dtype=np.int64), return_counts=True)
+    b_values, b_counts = np.unique(np.asarray(col_sums, dtype=np.int64), return_counts=True)
+    b = b_values.astype(np.float64)
+    log_n = np.log(n)
+    emi = 0.0
+    for a, a_count in zip(a_values, a_counts):
+        lo = np.maximum(1, a + b_values - n)
+        hi = np.minimum(a, b_values)
+        if tail_sd is not None:
+            mean = a * b / n
+            sd = np.sqrt(mean * (1 - a / n) * (n - b) / max(n - 1, 1))
+            # The upper cut is deliberately wider, at tail_sd * (sd + 1): n_ij is right-skewed when its mean is
+            # small, and its terms grow with n_ij, so cutting at tail_sd * sd above the mean loses about 1e-2 of
+            # the EMI at tail_sd = 4 (vs 1e-5 here). The extra tail_sd also keeps the range non-empty when sd == 0.
+            lo = np.maximum(lo, np.floor(mean - tail_sd * sd).astype(np.int64))
+            hi = np.minimum(hi, np.ceil(mean + tail_sd * (sd + 1)).astype(np.int64))
+        lengths = np.maximum(hi - lo + 1, 0)
+        pair = np.repeat(np.arange(len(b_values)), lengths)
+        nij = (np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + lo[pair]).astype(np.float64)
+        bj = b[pair]
+        log_p = (gammaln(a + 1) + gammaln(bj + 1) + gammaln(n - a + 1) + gammaln(n - bj + 1) - gammaln(n + 1)
+                 - gammaln(nij + 1) - gammaln(a - nij + 1) - gammaln(bj - nij + 1) - gammaln(n - a - bj + nij + 1))
+        terms = nij / n * (log_n + np.log(nij) - np.log(a) - np.log(bj)) * np.exp(log_p)
+        emi += a_count * np.sum(np.bincount(pair, weights=terms, minlength=len(b_values)) * b_counts)
+    return float(emi)
+
+
+def ami_from_contingency(contingency, emi_mode='grouped', tail_sd=8):
+    # emi_mode: 'exact' (sklearn, one term per cluster pair), 'grouped' (same value, one term per pair of distinct
+    # cluster sizes) or 'approx' (grouped, with the hypergeometric sums cut at tail_sd standard deviations)
+    n_true, n_est = contingency.shape
+    if n_true == n_est == 1 or n_true == n_est == 0:
+        return 1.0
+    elif n_true == 1 or n_est == 1:
+        return 0.0
+    if emi_mode == 'exact':
+        # one label pair per node, rebuilt from the table
+        from sklearn.metrics import adjusted_mutual_info_score
+        table = contingency.tocoo()
+        return float(adjusted_mutual_info_score(np.repeat(table.row, table.data), np.repeat(table.col, table.data)))
+    n = int(contingency.sum())
+    mi = mutual_information(contingency)
+    emi = grouped_expected_mutual_information(np.ravel(contingency.sum(axis=1)), np.ravel(contingency.sum(axis=0)), n,
+                                              tail_sd if emi_mode == 'approx' else None)
+    h_true = entropy_from_sizes(np.ravel(contingency.sum(axis=1)))
+    h_est = entropy_from_sizes(np.ravel(contingency.sum(axis=0)))
+    eps = np.finfo('float64').eps
+    # same sign-preserving guards as sklearn's adjusted_mutual_info_score
+    denominator = np.mean([h_true, h_est]) - emi
+    denominator = min(denominator, -eps) if denominator < 0 else max(denominator, eps)
+    numerator = mi - emi
+    numerator = min(numerator, -eps) if numerator < 0 else max(numerator, eps)
+    return float(numerator / denominator)
+
+
+def ari_from_pair_counts(tp, fp, fn, tn):
+    if fn == 0 and fp == 0:
+        return 1.0
+    return 2. * (tp * tn - fn * fp) / ((tp + fn) * (fn + tn) + (tp + fp) * (fp + tn))
+
+
+def measure_accuracy(mem_true, mem_est, emi_mode='grouped', tail_sd=8):
+    contingency = contingency_table(mem_true, mem_est)
+    tp, fp, fn, tn = pair_counts(contingency)
     precision = tp / (tp + fp)
     recall = tp / (tp + fn)
     f1_score = 2 * precision * recall / (precision + recall)
     fnr = fn / (fn + tp)
     fpr = fp / (fp + tn)
 
-    nmi = normalized_mutual_info_score(mem_true, mem_est)
-    ari = adjusted_rand_score(mem_true, mem_est)
-    ami = adjusted_mutual_info_score(mem_true, mem_est)
+    nmi = nmi_from_contingency(contingency)
+    ari = ari_from_pair_counts(tp, fp, fn, tn)
+    ami = ami_from_contingency(contingency, emi_mode, tail_sd)
 
     return nmi, ami, ari, precision, recall, f1_score, fnr, fpr
 
 
+ACCURACY_COLUMNS = ['clustering', 'nodes', 'singletons_added', 'nmi', 'ami', 'ari', 'precision', 'recall', 'f1_score',
+                    'fnr', 'fpr']
+
+# ground truth, set before the pool is forked so that workers share it instead of re-reading it
+accuracy_context = {}
+
+
+def score_clustering(clustering_path):
+    gt_ids, gt_labels, gt_codes = accuracy_context['gt']
+    first_record = len(profiler.records)
+    ids, labels = read_membership_arrays(clustering_path)
+    if accuracy_context['shared_nodes']:
+        # nodes shared by this clustering and the ground truth
+        keys = np.intersect1d(gt_ids, ids, assume_unique=True)
+        mem_true = align_labels(keys, gt_ids, gt_labels)[0]
+    else:
+        keys, mem_true = gt_ids, gt_codes
+    with profiler.stage('accuracy:' + clustering_path):
+        mem_est, singletons_added = align_labels(keys, ids, labels)
+        scores = measure_accuracy(mem_true, mem_est, accuracy_context['emi_mode'], accuracy_context['tail_sd'])
+    row = dict(zip(ACCURACY_COLUMNS, [clustering_path, len(keys), int(singletons_added)] + [float(x) for x in scores]))
+    return row, profiler.records[first_record:]
+
+
+def score_clusterings(gt_path, clustering_paths, processes=1, shared_nodes=False, emi_mode='grouped', tail_sd=8):
+    gt_ids, gt_labels = read_membership_arrays(gt_path)
+    accuracy_context.update(gt=(gt_ids, gt_labels, align_labels(gt_ids, gt_ids, gt_labels)[0]),
+                            shared_nodes=shared_nodes, emi_mode=emi_mode, tail_sd=tail_sd)
+    if processes <= 1 or len(clustering_paths) <= 1:
+        return [score_clustering(path)[0] for path in clustering_paths]
+    with mp.get_context('fork').Pool(processes) as pool:
+        results = pool.map(score_clustering, clustering_paths, chunksize=1)
+    for _, records in results:
+        profiler.merge(records)
+    return [row for row, _ in results]
+
+
+def write_scores(rows, out_path=None):
+    # JSON when the path ends in .json, CSV otherwise (to stdout without a path)
+    if out_path and out_path.endswith('.json'):
+        with open(out_path, 'w') as f:
+            f.write(json.dumps(rows, indent=4))
+        return
+    f = open(out_path, 'w', newline='') if out_path else sys.stdout
+    writer = csv.DictWriter(f, fieldnames=ACCURACY_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    if out_path:
+        f.close()
+
+
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="LFR accuracy for pre-CM vs post-CM partitions")
+    parser = argparse.ArgumentParser(description="LFR accuracy for pre-CM vs post-CM partitions, or for any number "
+                                                 "of partitions against one ground truth")
     parser.add_argument("-gt", "--groundtruth", type=str, required=True,
                         help="File containing ground-truth community membership")
-    parser.add_argument("-p1", "--partition1", type=str, required=True,
+    parser.add_argument("-p1", "--partition1", type=str, required=False,
                         help="File containing original (pre-CM) community membership")
-    parser.add_argument("-p2", "--partition2", type=str, required=True,
+    parser.add_argument("-p2", "--partition2", type=str, required=False,
                         help="File containing post-CM community membership")
+    parser.add_argument("-c", "--clusterings", type=str, nargs="+", required=False,
+                        help="Any number of membership files to score against the ground truth, read once; "
+                             "replaces -p1/-p2 and writes one table row per clustering")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of processes scoring the clusterings given with -c")
+    parser.add_argument("-o", "--output", type=str, required=False,
+                        help="table of scores for -c: JSON if the path ends in .json, CSV otherwise "
+                             "(default: CSV on stdout)")
+    parser.add_argument("--shared-nodes", action="store_true",
+                        help="with -c, score each clustering on the nodes it shares with the ground truth instead "
+                             "of adding the missing nodes as singletons")
+    parser.add_argument("--alignment", type=str, choices=["arrays", "dicts"], default="arrays",
+                        help="align the partitions with sorted integer arrays (default) or with the original "
+                             "per-node dictionaries, which also accept non-integer community labels")
+    parser.add_argument("--emi", type=str, choices=["exact", "grouped", "approx"], default="grouped",
+                        help="expected mutual information for AMI: sklearn's per-cluster-pair sum (exact), the same "
+                             "sum over pairs of distinct cluster sizes (grouped, default), or grouped with truncated "
+                             "hypergeometric tails (approx), for partitions with many large clusters")
+    parser.add_argument("--emi-tail-sd", type=float, default=8,
+                        help="with --emi approx, standard deviations kept below the mean; above it, tail_sd * (sd + 1) "
+                             "is kept since the distribution is right-skewed; smaller is faster and less accurate "
+                             "(default: 8)")
+    parser.add_argument("--profile", metavar="path", type=str, nargs="?", const="",
+                        help="write per-stage wall time, cpu time and memory as JSON "
+                             "(default path: <partition1>.accuracy-profile.json)")
     args = parser.parse_args()
-    gt_membership, membership1, membership2 = get_membership_list_add_singletons(args.groundtruth, args.partition1, args.partition2)
-
-    cluster_sizes = membership_to_partition(gt_membership)
+    if args.profile is not None:
+        profiler.enable()
+    if args.clusterings:
+        rows = score_clusterings(args.groundtruth, args.clusterings, args.processes, args.shared_nodes, args.emi,
+                                 args.emi_tail_sd)
+        write_scores(rows, args.output)
+        if args.profile is not None:
+            profiler.write(args.profile or profile_path(args.clusterings[0], 'accuracy-profile'))
+        sys.exit(0)
+    if not args.partition1 or not args.partition2:
+        parser.error('either -p1 and -p2 or -c is required')
+    with profiler.stage('read_memberships'):
+        if args.alignment == 'arrays':
+            gt_membership, membership1, membership2 = get_label_arrays_add_singletons(args.groundtruth, args.partition1,
+                                                                                      args.partition2)
+            cluster_sizes = np.bincount(gt_membership)
+        else:
+            gt_membership, membership1, membership2 = get_membership_list_add_singletons(args.groundtruth, args.partition1, args.partition2)
+            cluster_sizes = membership_to_partition(gt_membership)
     cluster_num = len(cluster_sizes)
     print('Ground-truth statistics:')
     print('cluster count:', cluster_num)
@@ -127,7 +378,8 @@ if __name__ == '__main__':
 
     # https://scikit-learn.org/stable/modules/classes.html#module-sklearn.metrics.cluster
     print('\nStatistics for original Leiden clustering:')
-    nmi, ami, ari, precision, recall, f1_score, fnr, fpr = measure_accuracy(gt_membership, membership1)
+    with profiler.stage('accuracy:partition1'):
+        nmi, ami, ari, precision, recall, f1_score, fnr, fpr = measure_accuracy(gt_membership, membership1, args.emi, args.emi_tail_sd)
     print("Normalized mutual information (NMI): ", nmi)
     print("Adjusted rand index (ARI): ", ari)
     print("Adjusted mutual information (AMI): ", ami)
@@ -136,10 +388,13 @@ if __name__ == '__main__':
 
 
     print('\nStatistics for post-CM Leiden clustering:')
-    nmi, ami, ari, precision, recall, f1_score, fnr, fpr = measure_accuracy(gt_membership, membership2)
+    with profiler.stage('accuracy:partition2'):
+        nmi, ami, ari, precision, recall, f1_score, fnr, fpr = measure_accuracy(gt_membership, membership2, args.emi, args.emi_tail_sd)
     print("Normalized mutual information (NMI): ", nmi)
     print("Adjusted rand index (ARI): ", ari)
     print("Adjusted mutual information (AMI): ", ami)
     print("False positive rate (FPR), False negative rate (FNR):", fpr, fnr)
     print("Precision, Recall, F1-score:", precision, recall, f1_score)
 
+    if args.profile is not None:
+        profiler.write(args.profile or profile_path(args.partition1, 'accuracy-profile'))
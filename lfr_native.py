@@ -0,0 +1,169 @@
+import os
+import numpy as np
+
+
+def truncated_powerlaw_mean(a, b, t):
+    return (t - 1) / (t - 2) * (a ** (2 - t) - b ** (2 - t)) / (a ** (1 - t) - b ** (1 - t))
+
+
+def sample_truncated_powerlaw(rng, size, a, b, t):
+    # inverse transform sampling of a continuous power law on [a, b]
+    u = rng.random(size)
+    return (a ** (1 - t) - u * (a ** (1 - t) - b ** (1 - t))) ** (1 / (1 - t))
+
+
+def fix_exponent(t):
+    # the closed forms below are singular at exactly 1 and 2
+    return t + 1e-6 if abs(t - 1) < 1e-6 or abs(t - 2) < 1e-6 else t
+
+
+def degree_sequence(rng, n, mean_degree, max_degree, t1, iterations=40):
+    t1 = fix_exponent(t1)
+    u = rng.random(n)
+    lo, hi = 0.5, float(max_degree)
+    # the mean grows with the lower cutoff, so bisect on the cutoff until the rounded sample hits the average degree
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        degrees = np.rint((mid ** (1 - t1) - u * (mid ** (1 - t1) - max_degree ** (1 - t1))) ** (1 / (1 - t1)))
+        if degrees.mean() < mean_degree:
+            lo = mid
+        else:
+            hi = mid
+    degrees = np.rint((hi ** (1 - t1) - u * (hi ** (1 - t1) - max_degree ** (1 - t1))) ** (1 / (1 - t1)))
+    return np.clip(degrees, 1, max_degree).astype(np.int64)
+
+
+def community_sizes(rng, n, min_size, max_size, t2):
+    t2 = fix_exponent(t2)
+    expected = truncated_powerlaw_mean(min_size, max_size, t2) if max_size > min_size else min_size
+    sizes = np.empty(0, dtype=np.int64)
+    while sizes.sum() < n:
+        batch = np.rint(sample_truncated_powerlaw(rng, int(n / expected) + 10, min_size, max_size, t2))
+        sizes = np.concatenate([sizes, np.clip(batch, min_size, max_size).astype(np.int64)])
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), n, side='right')]
+    deficit = n - sizes.sum()
+    if deficit >= min_size:
+        sizes = np.append(sizes, deficit)
+    else:
+        # spread the remaining nodes over communities that still have room
+        while deficit > 0:
+            room = np.flatnonzero(sizes < max_size)
+            if len(room) == 0:
+                sizes = np.append(sizes, deficit)
+                break
+            chosen = rng.choice(room, size=min(deficit, len(room)), replace=False)
+            sizes[chosen] += 1
+            deficit -= len(chosen)
+    return sizes
+
+
+def assign_communities(rng, internal_degrees, sizes, rounds=10):
+    # random assignment, then swap nodes that do not fit (internal degree >= community size) into larger communities
+    membership = rng.permutation(np.repeat(np.arange(len(sizes)), sizes))
+    for _ in range(rounds):
+        need = internal_degrees + 1
+        bad = np.flatnonzero(need > sizes[membership])
+        if len(bad) == 0:
+            break
+        bad = bad[np.argsort(-need[bad])]
+        fits = np.flatnonzero(need <= sizes[membership])
+        victims = fits[np.lexsort((need[fits], -sizes[membership[fits]]))][:len(bad)]
+        bad = bad[:len(victims)]
+        ok = (need[bad] <= sizes[membership[victims]]) & (need[victims] <= sizes[membership[bad]])
+        bad, victims = bad[ok], victims[ok]
+        membership[bad], membership[victims] = membership[victims], membership[bad].copy()
+    # whatever still does not fit keeps its community with the internal degree capped
+    internal_degrees = np.minimum(internal_degrees, sizes[membership] - 1)
+    return membership, internal_degrees
+
+
+def pair_stubs_by_group(rng, owners, groups):
+    perm = rng.permutation(len(owners))
+    order = perm[np.argsort(groups[perm], kind='stable')]
+    owners, groups = owners[order], groups[order]
+    if len(groups) == 0:
+        return owners, owners
+    starts = np.r_[0, np.flatnonzero(groups[1:] != groups[:-1]) + 1]
+    lengths = np.diff(np.r_[starts, len(groups)])
+    position = np.arange(len(groups)) - np.repeat(starts, lengths)
+    # drop one stub from every group with an odd stub count
+    owners = owners[position < np.repeat(lengths - lengths % 2, lengths)]
+    return owners[0::2], owners[1::2]
+
+
+def edge_keys(n, src, dst):
+    return np.minimum(src, dst).astype(np.int64) * n + np.maximum(src, dst)
+
+
+def invalid_edges(src, dst, membership, internal):
+    invalid = src == dst
+    if not internal:
+        invalid |= membership[src] == membership[dst]
+    return invalid
+
+
+def sorted_edges(n, src, dst, membership, internal):
+    keys = edge_keys(n, src, dst)
+    order = np.argsort(keys)
+    keys, src, dst = keys[order], src[order], dst[order]
+    bad = invalid_edges(src, dst, membership, internal)
+    bad[1:] |= keys[1:] == keys[:-1]
+    return keys, src, dst, bad
+
+
+def wire(rng, n, owners, membership, internal, rounds=20, tolerance=1e-4):
+    # configuration model (within communities for internal stubs), then repeatedly re-pair the stubs of bad edges
+    # (self-loops, repeats, external edges inside a community) together with about as many randomly broken good
+    # edges so that rejected stubs get new partners; edges are kept sorted by key so each round only sorts the
+    # re-paired edges and merges them in
+    groups = membership if internal else np.zeros(len(membership), dtype=np.int64)
+    keys, src, dst, bad = sorted_edges(n, *pair_stubs_by_group(rng, owners, groups[owners]), membership, internal)
+    for _ in range(rounds):
+        # a tiny remainder is cheaper to drop than to keep rewiring
+        if bad.sum() <= tolerance * len(bad):
+            break
+        bad |= rng.random(len(bad)) < min(1.0, 2 * bad.sum() / len(bad))
+        stubs = np.concatenate([src[bad], dst[bad]])
+        keys, src, dst = keys[~bad], src[~bad], dst[~bad]
+        new_keys, new_src, new_dst, new_bad = sorted_edges(n, *pair_stubs_by_group(rng, stubs, groups[stubs]),
+                                                           membership, internal)
+        pos = np.searchsorted(keys, new_keys)
+        if len(keys):
+            new_bad |= keys[np.minimum(pos, len(keys) - 1)] == new_keys
+        bad = np.insert(np.zeros(len(keys), dtype=bool), pos, new_bad)
+        keys, src, dst = np.insert(keys, pos, new_keys), np.insert(src, pos, new_src), np.insert(dst, pos, new_dst)
+    return src[~bad], dst[~bad]
+
+
+def generate_lfr(params, seed=None):
+    # params uses the LFR binary's flags: N, k, maxk, mu, minc, maxc, t1, t2
+    rng = np.random.default_rng(seed)
+    n = int(params['N'])
+    degrees = degree_sequence(rng, n, float(params['k']), int(params['maxk']), float(params['t1']))
+    internal_degrees = np.rint((1 - float(params['mu'])) * degrees).astype(np.int64)
+    sizes = community_sizes(rng, n, int(params['minc']), int(params['maxc']), float(params['t2']))
+    membership, internal_degrees = assign_communities(rng, internal_degrees, sizes)
+    external_degrees = degrees - internal_degrees
+
+    node_ids = np.arange(n, dtype=np.int32 if n < 2 ** 31 else np.int64)
+    in_src, in_dst = wire(rng, n, np.repeat(node_ids, internal_degrees), membership, internal=True)
+    out_src, out_dst = wire(rng, n, np.repeat(node_ids, external_degrees), membership, internal=False)
+    src, dst = np.concatenate([in_src, out_src]), np.concatenate([in_dst, out_dst])
+    edges = np.stack([np.minimum(src, dst), np.maximum(src, dst)], axis=1)
+    return edges, membership
+
+
+def write_lfr_text(lfr_net_dir, edges, membership):
+    # same 1-based layout as the LFR binary's network.dat / community.dat
+    np.savetxt(os.path.join(lfr_net_dir, 'network.dat'), edges + 1, fmt='%d', delimiter='\t')
+    nodes = np.arange(1, len(membership) + 1)
+    np.savetxt(os.path.join(lfr_net_dir, 'community.dat'), np.stack([nodes, membership + 1], axis=1),
+               fmt='%d', delimiter='\t')
+
+
+def write_lfr_binary(lfr_net_dir, edges, membership, compress=False):
+    # the same 1-based ids as write_lfr_text, as int32 pairs in network.npy / community.npy (or .npz)
+    from fast_io import save_binary_pairs
+    save_binary_pairs(os.path.join(lfr_net_dir, 'network'), edges + 1, compress)
+    nodes = np.arange(1, len(membership) + 1)
+    save_binary_pairs(os.path.join(lfr_net_dir, 'community'), np.stack([nodes, membership + 1], axis=1), compress)
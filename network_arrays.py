@@ -0,0 +1,41 @@
+import numpy as np
+
+
+def graph_to_arrays(net):
+    # returns the node ids of a networkx graph in a fixed order and each edge once as two arrays of positions into
+    # that order
+    import scipy.sparse as sp
+    import networkx as nx
+    nodes = list(net.nodes)
+    adj = sp.triu(nx.to_scipy_sparse_array(net, nodelist=nodes, weight=None, format='csr')).tocoo()
+    return nodes, adj.row.astype(np.int64, copy=False), adj.col.astype(np.int64, copy=False)
+
+
+def encode_membership(nodes, membership):
+    labels = np.array([membership[v] for v in nodes])
+    _, codes = np.unique(labels, return_inverse=True)
+    return codes.ravel().astype(np.int64, copy=False)
+
+
+def mixing_param_from_arrays(src, dst, labels):
+    n = len(labels)
+    co_clustered = labels[src] == labels[dst]
+    in_degree = np.bincount(src[co_clustered], minlength=n) + np.bincount(dst[co_clustered], minlength=n)
+    out_degree = np.bincount(src[~co_clustered], minlength=n) + np.bincount(dst[~co_clustered], minlength=n)
+    degree = in_degree + out_degree
+    mus = np.divide(out_degree, degree, out=np.zeros(n), where=degree != 0)
+    return np.mean(mus)
+
+
+def modularity_from_arrays(src, dst, labels):
+    # Newman modularity from per-cluster internal edge counts and degree sums; as in networkx, a self-loop is one
+    # internal edge and adds two to the degree of its node
+    edge_count = len(src)
+    if edge_count == 0:
+        return float('nan')
+    cluster_count = int(labels.max()) + 1
+    co_clustered = labels[src] == labels[dst]
+    internal = np.bincount(labels[src[co_clustered]], minlength=cluster_count)
+    degree_sums = np.bincount(labels[src], minlength=cluster_count) + np.bincount(labels[dst], minlength=cluster_count)
+    return float(internal.sum() / edge_count - np.sum((degree_sums / (2 * edge_count)) ** 2))
+
@@ -0,0 +1,74 @@
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from streaming_stats import find_roots, union_edges, BLOCK
+
+
+# shared-memory arrays, set before the pool is forked so that workers use them in place
+shared = {}
+
+
+def shared_array(size, dtype, segments):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, size * np.dtype(dtype).itemsize))
+    segments.append(shm)
+    return np.ndarray(size, dtype=dtype, buffer=shm.buf)
+
+
+def chunk_bounds(size, chunks):
+    edges = np.linspace(0, size, chunks + 1).astype(np.int64)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def union_chunk(bounds):
+    # returns how many edges still joined two different trees when this pass reached them
+    start, stop = bounds
+    parent = shared['parent']
+    unjoined = 0
+    for a in range(start, stop, BLOCK):
+        src, dst = shared['src'][a:min(a + BLOCK, stop)], shared['dst'][a:min(a + BLOCK, stop)]
+        differ = find_roots(parent, src) != find_roots(parent, dst)
+        if differ.any():
+            unjoined += int(differ.sum())
+            union_edges(parent, src[differ], dst[differ])
+    return unjoined
+
+
+def flatten_chunk(bounds):
+    start, stop = bounds
+    parent = shared['parent']
+    while True:
+        block = parent[start:stop]
+        up = parent[block]
+        if np.array_equal(up, block):
+            break
+        parent[start:stop] = up
+
+
+def parallel_network_statistics(node_count, src, dst, processes, components=True):
+    # Workers hook roots onto smaller roots over their own edge chunks, all in one shared parent array. Every
+    # pointer goes to a smaller index, so concurrent writes cannot form cycles, though they can lose a union.
+    # Passes repeat until none finds an edge across two trees, then every node is pointed straight at its root.
+    # Degrees are two bincounts, which are memory-bound and gain nothing from the pool.
+    degrees = np.bincount(src, minlength=node_count) + np.bincount(dst, minlength=node_count)
+    component_sizes = None
+    if components:
+        segments = []
+        try:
+            shared['src'] = shared_array(len(src), np.int64, segments)
+            shared['dst'] = shared_array(len(dst), np.int64, segments)
+            shared['src'][:], shared['dst'][:] = src, dst
+            shared['parent'] = shared_array(node_count, np.int64, segments)
+            shared['parent'][:] = np.arange(node_count)
+            edge_chunks = chunk_bounds(len(src), 4 * processes)
+            with mp.get_context('fork').Pool(processes) as pool:
+                while sum(pool.map(union_chunk, edge_chunks)) > 0:
+                    pass
+                pool.map(flatten_chunk, chunk_bounds(node_count, 4 * processes))
+            component_sizes = np.bincount(shared['parent'])
+        finally:
+            shared.clear()
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+        component_sizes = component_sizes[component_sizes > 0]
+    return node_count, len(src), degrees, int(np.sum(degrees == 0)), component_sizes
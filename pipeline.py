@@ -0,0 +1,274 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from fast_io import stats_path
+from gen_lfr import lfr_params
+from profiling import maxrss_mb
+
+
+STAGES = ['estimate', 'lfr', 'estimate_lfr', 'accuracy']
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# rough peak memory of one stage, used to decide which stages may run side by side
+BYTES_PER_EDGE = 200
+BYTES_PER_NODE = 500
+
+
+def physical_memory_mb():
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / (1024 * 1024)
+
+
+def memory_estimate_mb(node_count, edge_count):
+    return (BYTES_PER_EDGE * edge_count + BYTES_PER_NODE * node_count) / (1024 * 1024)
+
+
+def read_catalogue(catalogue_path):
+    with open(catalogue_path) as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+
+def lfr_row_name(name):
+    # the catalogue lists the emulation of <network>_leiden.<r>.tsv as <network>_lfr_gt.<r>.tsv
+    if '_leiden' in name:
+        return name.replace('_leiden', '_lfr_gt', 1)
+    return name.replace('.tsv', '') + '_lfr_gt.tsv'
+
+
+def native_lfr(lfr_args):
+    # whether gen_lfr runs the in-process generator, which emulates networks at full size
+    return any(a == '--backend=native' or (a == 'native' and i > 0 and lfr_args[i - 1] == '--backend')
+               for i, a in enumerate(lfr_args))
+
+
+def catalogue_jobs(rows, data_dir, network_template, work_dir, cmin, names=None, native=False):
+    # one job per catalogue row that describes an input clustering (emulation rows are outputs of other jobs)
+    jobs = []
+    for row in rows:
+        name = row['name']
+        if '_lfr_gt' in name or (names and not any(n in name for n in names)):
+            continue
+        network = network_template.format(network=name.split('_leiden')[0].replace('.tsv', ''))
+        clustering = os.path.join(work_dir, name)
+        stats = stats_path(clustering)
+        lfr_dir = stats.replace('.json', '') + '_lfr_' + cmin
+        node_count, edge_count = int(float(row['node-count'])), int(float(row['edge-count']))
+        # the LFR binary works on a downscaled network; the native generator does not
+        params = lfr_params({k: float(v) for k, v in row.items() if k != 'name' and v}, cmin, clamp=not native)
+        lfr_edge_count = params['N'] * params['k'] / 2
+        jobs.append({'name': name, 'network': os.path.join(data_dir, network),
+                     'source': os.path.join(data_dir, name), 'clustering': clustering, 'stats': stats,
+                     'lfr_dir': lfr_dir, 'lfr_name': lfr_row_name(name),
+                     'memory_mb': {'estimate': memory_estimate_mb(node_count, edge_count),
+                                   'lfr': memory_estimate_mb(params['N'], lfr_edge_count),
+                                   'estimate_lfr': memory_estimate_mb(params['N'], lfr_edge_count),
+                                   'accuracy': memory_estimate_mb(params['N'], 0)}})
+    return jobs
+
+
+def lfr_output(lfr_dir, name):
+    # network.dat / community.dat, or their converted .npy / .npz form
+    for suffix in ('.dat', '.npy', '.npz'):
+        path = os.path.join(lfr_dir, name + suffix)
+        if os.path.exists(path):
+            return path
+    return os.path.join(lfr_dir, name + '.dat')
+
+
+def stage_command(job, stage, options):
+    # the command of a stage and the files it has to leave behind; None when the stage has nothing to do
+    python = [sys.executable]
+    if stage == 'estimate':
+        return python + [os.path.join(SCRIPT_DIR, 'estimate_properties.py'), '-n', job['network'], '-c',
+                         job['clustering']] + options['estimate_args'], [job['stats']]
+    if stage == 'lfr':
+        return python + [os.path.join(SCRIPT_DIR, 'gen_lfr.py'), '-n', job['stats'], '-cm', options['cmin']] + \
+               options['lfr_args'], [lfr_output(job['lfr_dir'], 'network')]
+    community = lfr_output(job['lfr_dir'], 'community')
+    if stage == 'estimate_lfr':
+        return python + [os.path.join(SCRIPT_DIR, 'estimate_properties.py'), '-n',
+                         lfr_output(job['lfr_dir'], 'network'), '-c', community] + options['estimate_args'], \
+               [stats_path(community)]
+    clusterings = sorted(p for pattern in options['clusterings']
+                         for p in glob.glob(os.path.join(job['lfr_dir'], pattern)))
+    if not clusterings:
+        return None
+    out_path = os.path.join(job['lfr_dir'], 'accuracy.csv')
+    return python + [os.path.join(SCRIPT_DIR, 'lfr_accuracy.py'), '-gt', community, '-c'] + clusterings + \
+           ['-o', out_path], [out_path]
+
+
+def stage_done(state, job, stage, outputs):
+    record = state.get(job['name'], {}).get(stage)
+    return record is not None and record['status'] in ('done', 'skipped') and all(os.path.exists(p) for p in outputs)
+
+
+def save_state(state, state_path):
+    with open(state_path + '.tmp', 'w') as f:
+        f.write(json.dumps(state, indent=4))
+    os.replace(state_path + '.tmp', state_path)
+
+
+def next_stage(job, state, options, after=None):
+    # the first stage of the job that is not checkpointed, with its command; stages without work are marked skipped
+    stages = STAGES if after is None else STAGES[STAGES.index(after) + 1:]
+    for stage in stages:
+        command = stage_command(job, stage, options)
+        if command is None:
+            state.setdefault(job['name'], {})[stage] = {'status': 'skipped'}
+            continue
+        if not stage_done(state, job, stage, command[1]):
+            return stage
+    return None
+
+
+def start_stage(job, stage, options, log_dir):
+    cmd, _ = stage_command(job, stage, options)
+    log_path = os.path.join(log_dir, '%s.%s.log' % (job['name'].replace('.tsv', ''), stage))
+    log = open(log_path, 'w')
+    log.write(' '.join(cmd) + '\n')
+    log.flush()
+    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+    return {'proc': proc, 'log': log, 'log_path': log_path, 'job': job, 'stage': stage, 'start': time.time(),
+            'memory_mb': stage_memory_mb(job, stage)}
+
+
+def stage_memory_mb(job, stage):
+    return job['memory_mb'][stage]
+
+
+def run_pipeline(jobs, state_path, processes, memory_mb, options, log_dir):
+    # Stages of one network run in order; stages of different networks share up to `processes` slots and the
+    # memory budget. Queued stages are admitted largest first, and admission stops at the first one that does
+    # not fit, so a large network waits for the running ones to finish and then runs alone.
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+    queue = []
+    for job in jobs:
+        if not os.path.exists(job['source']) or not os.path.exists(job['network']):
+            print('skipping', job['name'], '(network or clustering not found in the data directory)')
+            continue
+        if not os.path.lexists(job['clustering']):
+            os.symlink(os.path.abspath(job['source']), job['clustering'])
+        stage = next_stage(job, state, options)
+        if stage is not None:
+            queue.append((job, stage))
+    save_state(state, state_path)
+    running = {}
+    while queue or running:
+        queue.sort(key=lambda item: -stage_memory_mb(*item))
+        while queue and len(running) < processes:
+            job, stage = queue[0]
+            used = sum(r['memory_mb'] for r in running.values())
+            if running and used + stage_memory_mb(job, stage) > memory_mb:
+                break
+            queue.pop(0)
+            run = start_stage(job, stage, options, log_dir)
+            running[run['proc'].pid] = run
+            print('started %s %s (~%.0f MB)' % (job['name'], stage, run['memory_mb']))
+            sys.stdout.flush()
+        pid, status, rusage = os.wait4(-1, 0)
+        run = running.pop(pid)
+        run['proc'].returncode = os.waitstatus_to_exitcode(status)
+        run['log'].close()
+        job, stage = run['job'], run['stage']
+        # outputs are looked up again: the LFR stage may have converted its files to .npy / .npz
+        ok = run['proc'].returncode == 0 and all(os.path.exists(p) for p in stage_command(job, stage, options)[1])
+        record = {'status': 'done' if ok else 'failed', 'returncode': run['proc'].returncode,
+                  'wall_time': time.time() - run['start'],
+                  'peak_rss_mb': maxrss_mb(rusage),
+                  'log': run['log_path']}
+        state.setdefault(job['name'], {})[stage] = record
+        print('%s\t%s\t%s\twall_time=%.1fs\tpeak_rss=%.1fMB' % (job['name'], stage, record['status'],
+                                                              record['wall_time'], record['peak_rss_mb']))
+        sys.stdout.flush()
+        if ok:
+            following = next_stage(job, state, options, after=stage)
+            if following is not None:
+                queue.append((job, following))
+        save_state(state, state_path)
+    return state
+
+
+def read_stats(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_catalogue(fieldnames, rows, jobs, out_path):
+    # catalogue rows are replaced by the statistics of the finished stages; emulations missing from the
+    # catalogue are added after their input row
+    updates = {}
+    for job in jobs:
+        updates[job['name']] = read_stats(job['stats'])
+        updates[job['lfr_name']] = read_stats(stats_path(lfr_output(job['lfr_dir'], 'community')))
+    names = [row['name'] for row in rows]
+    out_rows = []
+    for row in rows:
+        out_rows.append(row)
+        job_names = [job['lfr_name'] for job in jobs if job['name'] == row['name'] and job['lfr_name'] not in names]
+        out_rows += [{'name': name} for name in job_names if updates.get(name)]
+    with open(out_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for index, row in enumerate(out_rows):
+            row = dict(row)
+            if updates.get(row['name']):
+                row.update(updates[row['name']])
+            row[fieldnames[0]] = index
+            writer.writerow(row)
+    print('catalogue written to', out_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Running estimation, LFR emulation and accuracy over a catalogue of '
+                                                 'network/clustering pairs, resuming from checkpointed stages.')
+    parser.add_argument('--catalogue', type=str, default='data_characteristics/network_params_lfr.csv',
+                        help='CSV with one row per clustering, as data_characteristics/network_params_lfr.csv; rows '
+                             'named *_lfr_gt* are emulations and are filled in from the LFR stages')
+    parser.add_argument('--data-dir', type=str, required=True,
+                        help='directory holding the clusterings named in the catalogue and their networks')
+    parser.add_argument('--network', type=str, default='{network}_cleaned.tsv',
+                        help='network file name in --data-dir; {network} is the clustering name up to _leiden '
+                             '(default: {network}_cleaned.tsv)')
+    parser.add_argument('--names', type=str, nargs='+', required=False,
+                        help='only process catalogue rows whose name contains one of these strings')
+    parser.add_argument('--work-dir', type=str, default='pipeline',
+                        help='directory for the statistics, LFR networks, logs and the checkpoint file')
+    parser.add_argument('-p', metavar='processes', type=int, default=1,
+                        help='maximum number of stages running at once')
+    parser.add_argument('--memory-mb', type=float, default=0.8 * physical_memory_mb(),
+                        help='memory budget shared by the running stages (default: 80%% of physical memory); a stage '
+                             'that does not fit next to the running ones waits, and runs alone if it never fits')
+    parser.add_argument('-cm', metavar='cmin', type=str, default='1',
+                        help='minimum community size of the LFR emulations')
+    parser.add_argument('--estimate-args', type=str, default='',
+                        help='extra arguments for estimate_properties.py, e.g. "--backend csr --fitter histogram"')
+    parser.add_argument('--lfr-args', type=str, default='--backend native',
+                        help='extra arguments for gen_lfr.py (default: --backend native; use "-lp <path>" for the '
+                             'LFR binary)')
+    parser.add_argument('--clusterings', type=str, nargs='+', default=[],
+                        help='glob patterns, relative to each LFR directory, of clusterings to score against the '
+                             'LFR ground truth; without them the accuracy stage is skipped')
+    parser.add_argument('-o', metavar='catalogue', type=str, required=False,
+                        help='updated catalogue CSV (default: <work-dir>/<catalogue name>)')
+    args = parser.parse_args()
+    os.makedirs(os.path.join(args.work_dir, 'logs'), exist_ok=True)
+    options = {'cmin': args.cm, 'estimate_args': shlex.split(args.estimate_args),
+               'lfr_args': shlex.split(args.lfr_args), 'clusterings': args.clusterings}
+    fieldnames, rows = read_catalogue(args.catalogue)
+    jobs = catalogue_jobs(rows, args.data_dir, args.network, args.work_dir, args.cm, args.names,
+                          native_lfr(options['lfr_args']))
+    run_pipeline(jobs, os.path.join(args.work_dir, 'pipeline_state.json'), args.p, args.memory_mb, options,
+                 os.path.join(args.work_dir, 'logs'))
+    write_catalogue(fieldnames, rows, jobs,
+                    args.o or os.path.join(args.work_dir, os.path.basename(args.catalogue)))
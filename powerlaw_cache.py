@@ -0,0 +1,84 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'emulate-real-nets', 'powerlaw')
+DEFAULT_MAX_ENTRIES = 1000
+# part of every key; bump it when the histogram fitter or the entry format changes so that older fits are not reused
+CACHE_VERSION = 2
+
+
+def powerlaw_version():
+    # read from the package metadata, so that keys can be computed without importing powerlaw
+    from importlib import metadata
+    try:
+        return metadata.version('powerlaw')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def fit_key(values, discrete=True, xmin=None, fitter='powerlaw'):
+    # identical samples compress to the same (value, count) histogram regardless of order
+    unique_values, counts = np.unique(np.asarray(values, dtype=np.float64), return_counts=True)
+    h = hashlib.sha256()
+    h.update(unique_values.tobytes())
+    h.update(counts.astype(np.int64).tobytes())
+    h.update(json.dumps({'discrete': bool(discrete), 'xmin': None if xmin is None else float(xmin),
+                         'fitter': fitter, 'version': CACHE_VERSION,
+                         'powerlaw': powerlaw_version() if fitter == 'powerlaw' else None}).encode())
+    return h.hexdigest()
+
+
+def evict(cache_dir, max_entries):
+    # other processes may evict the same directory at the same time, so entries can vanish at any point
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.json'):
+            path = os.path.join(cache_dir, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                pass
+    if len(entries) <= max_entries:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # removed by another process
+
+
+def fit_powerlaw(values, discrete=True, xmin=None, fitter='powerlaw', processes=1):
+    if fitter == 'histogram':
+        from powerlaw_hist import fit_discrete_powerlaw
+        return fit_discrete_powerlaw(values, xmin=xmin, processes=processes)
+    import powerlaw
+    if xmin is None:
+        dist = powerlaw.Fit(values, discrete=discrete)
+    else:
+        dist = powerlaw.Fit(values, discrete=discrete, xmin=xmin)
+    return float(dist.power_law.alpha), float(dist.power_law.xmin)
+
+
+def cached_powerlaw_fit(values, discrete=True, xmin=None, cache_dir=DEFAULT_CACHE_DIR,
+                        max_entries=DEFAULT_MAX_ENTRIES, fitter='powerlaw', processes=1):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, fit_key(values, discrete, xmin, fitter) + '.json')
+    try:
+        with open(path) as f:
+            result = json.load(f)
+        os.utime(path)  # least recently used entries are evicted first
+        return result['alpha'], result['xmin']
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    alpha, fitted_xmin = fit_powerlaw(values, discrete, xmin, fitter, processes)
+    # write then rename so concurrent readers never see a partial entry
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump({'alpha': alpha, 'xmin': fitted_xmin}, f)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_entries)
+    return alpha, fitted_xmin
@@ -0,0 +1,103 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import minimize_scalar
+from scipy.special import zeta
+
+
+# powerlaw's default range for alpha; numerical fits within BOUNDARY_EPS of a bound are flagged as noise there
+ALPHA_RANGE = (0.0, 3.0)
+BOUNDARY_EPS = 1e-2
+
+
+def histogram(values):
+    values = np.asarray(values)
+    values = values[values > 0]
+    if np.issubdtype(values.dtype, np.integer):
+        counts = np.bincount(values)
+        x = np.nonzero(counts)[0]
+        return x.astype(np.float64), counts[x].astype(np.float64)
+    x, counts = np.unique(values, return_counts=True)
+    return x.astype(np.float64), counts.astype(np.float64)
+
+
+def estimate_alphas(x, counts):
+    # discrete approximation of Clauset et al. for every candidate xmin at once, using suffix sums
+    n_tail = np.cumsum(counts[::-1])[::-1]
+    log_sum = np.cumsum((counts * np.log(x))[::-1])[::-1]
+    return 1 + n_tail / (log_sum - n_tail * np.log(x - 0.5))
+
+
+def mle_alpha(x, counts, xmin):
+    # exact discrete likelihood, used where the approximation is known to be poor
+    tail = x >= xmin
+    n, log_sum = counts[tail].sum(), np.sum(counts[tail] * np.log(x[tail]))
+    result = minimize_scalar(lambda a: a * log_sum + n * np.log(zeta(a, xmin)),
+                             bounds=(1.0001, ALPHA_RANGE[1]), method='bounded')
+    return result.x
+
+
+def approximated(xmin, estimate):
+    # same rule as powerlaw: the approximation is only trusted for xmin >= 10 and alpha in (1.5, 3]
+    return xmin >= 10 and 1.5 < estimate <= 3
+
+
+def fit_alpha(x, counts, xmin, estimate):
+    if approximated(xmin, estimate):
+        return estimate
+    return mle_alpha(x, counts, xmin)
+
+
+def valid_alpha(xmin, estimate, alpha):
+    # whether powerlaw would consider the fit at this xmin when choosing xmin: alpha strictly inside ALPHA_RANGE
+    # and, for a numerical fit, not at its bounds
+    margin = 0 if approximated(xmin, estimate) else BOUNDARY_EPS
+    return ALPHA_RANGE[0] + margin < alpha < ALPHA_RANGE[1] - margin
+
+
+def ks_distance(x, counts, xmin, alpha):
+    # as in powerlaw, both CDFs are P(X < x) at the distinct values of the tail, and a fit out of range has a CDF
+    # of zero
+    tail = x >= xmin
+    x, counts = x[tail], counts[tail]
+    empirical = (np.cumsum(counts) - counts) / counts.sum()
+    if not ALPHA_RANGE[0] < alpha < ALPHA_RANGE[1]:
+        return np.max(empirical)
+    theoretical = 1 - zeta(alpha, x) / zeta(alpha, xmin)
+    return np.max(np.abs(empirical - theoretical))
+
+
+def scan_xmins(x, counts, indices, estimates):
+    alphas = np.array([fit_alpha(x, counts, x[i], estimates[i]) for i in indices])
+    distances = np.array([ks_distance(x, counts, x[i], a) for i, a in zip(indices, alphas)])
+    valid = np.array([valid_alpha(x[i], estimates[i], a) for i, a in zip(indices, alphas)], dtype=bool)
+    return alphas, distances, valid
+
+
+def fit_discrete_powerlaw(values=None, xmin=None, hist=None, processes=1):
+    x, counts = hist if hist is not None else histogram(values)
+    estimates = estimate_alphas(x, counts)
+    if xmin is not None:
+        i = np.searchsorted(x, xmin)
+        estimate = 1 + counts[i:].sum() / np.sum(counts[i:] * np.log(x[i:] / (xmin - 0.5))) \
+            if xmin > 0.5 else estimates[i]
+        return float(fit_alpha(x, counts, xmin, estimate)), float(xmin)
+    # as in powerlaw, the two largest distinct values are not candidates: values equal to the maximum are left out
+    # of the candidate range, and its last value is dropped as well
+    if len(x) < 4:
+        return float('nan'), float('nan')
+    indices = np.arange(len(x) - 2)
+    if processes > 1:
+        chunks = np.array_split(indices, processes)
+        with ProcessPoolExecutor(processes) as pool:
+            parts = list(pool.map(scan_xmins, [x] * len(chunks), [counts] * len(chunks), chunks,
+                                  [estimates] * len(chunks)))
+        alphas = np.concatenate([p[0] for p in parts])
+        distances = np.concatenate([p[1] for p in parts])
+        valid = np.concatenate([p[2] for p in parts])
+    else:
+        alphas, distances, valid = scan_xmins(x, counts, indices, estimates)
+    # as in powerlaw, xmin values whose alpha is out of range are only used when no other value is left
+    if valid.any():
+        distances = np.where(valid, distances, np.nan)
+    best = int(np.nanargmin(distances))
+    return float(alphas[best]), float(x[indices[best]])
@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+
+
+def maxrss_mb(rusage):
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    return maxrss_mb(resource.getrusage(who))
+
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()  # no /proc: the lifetime peak is the best available bound
+
+
+def profile_path(base_path, tag='profile'):
+    return os.path.splitext(base_path)[0] + '.' + tag + '.json'
+
+
+class Profiler:
+    # wall time, cpu time and resident memory per named stage; nested stages are recorded as 'outer/inner', and
+    # memory is sampled by a background thread so each stage gets its own peak
+
+    def __init__(self, interval=0.05):
+        self.enabled = False
+        self.interval = interval
+        self.records = []
+        self.open_stages = []
+        self.lock = threading.Lock()
+        self.origin = time.time()
+        os.register_at_fork(after_in_child=self.after_fork)
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            self.origin = time.time()
+            self.start_sampler()
+
+    def start_sampler(self):
+        threading.Thread(target=self.sample, daemon=True).start()
+
+    def after_fork(self):
+        # a forked worker reports only its own stages, under the names of the stages open at fork time
+        self.lock = threading.Lock()
+        self.records = []
+        if self.enabled:
+            self.start_sampler()
+
+    def sample(self):
+        while True:
+            time.sleep(self.interval)
+            rss = current_rss_mb()
+            with self.lock:
+                for stage in self.open_stages:
+                    stage['peak_rss_mb'] = max(stage['peak_rss_mb'], rss)
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        rss = current_rss_mb()
+        if self.open_stages:
+            name = self.open_stages[-1]['stage'] + '/' + name
+        stage = {'stage': name,
+                 'start': time.time() - self.origin, 'rss_start_mb': rss, 'peak_rss_mb': rss}
+        wall, cpu = time.time(), time.process_time()
+        with self.lock:
+            self.open_stages.append(stage)
+        try:
+            yield
+        finally:
+            rss = current_rss_mb()
+            with self.lock:
+                self.open_stages.remove(stage)
+            self.records.append({'stage': stage['stage'], 'start': stage['start'], 'wall_time': time.time() - wall,
+                                 'cpu_time': time.process_time() - cpu, 'rss_start_mb': stage['rss_start_mb'],
+                                 'rss_end_mb': rss, 'peak_rss_mb': max(stage['peak_rss_mb'], rss)})
+
+    def merge(self, records):
+        # stages recorded by worker processes
+        self.records.extend(records)
+
+    def report(self):
+        return {'command': sys.argv,
+                'wall_time': time.time() - self.origin,
+                'peak_rss_mb': peak_rss_mb(),
+                'children_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+                'stages': sorted(self.records, key=lambda r: r['start'])}
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(json.dumps(self.report(), indent=4))
+        print('profile written to', path)
+
+
+# shared by every script; stages are no-ops until enable() is called
+profiler = Profiler()
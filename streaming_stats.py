@@ -0,0 +1,190 @@
+import os
+import tempfile
+import numpy as np
+from fast_io import read_chunks, parse_chunk, load_membership, is_binary_pairs, load_binary_pairs
+
+
+STREAM_CHUNK_BYTES = 16 * 1024 * 1024
+BLOCK = 1 << 22
+
+
+def stream_edges(edge_path, chunk_bytes=STREAM_CHUNK_BYTES):
+    if is_binary_pairs(edge_path):
+        edges = load_binary_pairs(edge_path)
+        rows = max(1, chunk_bytes // 16)
+        for start in range(0, len(edges), rows):
+            chunk = np.asarray(edges[start:start + rows], dtype=np.int64)
+            yield chunk[:, 0], chunk[:, 1]
+        return
+    for block in read_chunks(edge_path, chunk_bytes):
+        edges = parse_chunk(block)
+        if len(edges):
+            yield edges[:, 0], edges[:, 1]
+
+
+def grow(array, size):
+    if len(array) >= size:
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def partition_edges(edge_path, out_dir, chunk_bytes=STREAM_CHUNK_BYTES):
+    # Writes every undirected edge once, as (min, max), into .npy files under out_dir. Edges are hash-partitioned
+    # so that each partition holds about chunk_bytes of input and can be sorted and deduplicated in memory; the
+    # LFR binary, for one, lists every edge in both directions.
+    parts = max(1, -(-os.path.getsize(edge_path) // chunk_bytes))
+    raw_paths = [os.path.join(out_dir, 'edges.%d.bin' % i) for i in range(parts)]
+    for src, dst in stream_edges(edge_path, chunk_bytes):
+        pairs = np.stack([np.minimum(src, dst), np.maximum(src, dst)], axis=1).astype(np.int64, copy=False)
+        part = ((pairs[:, 0].astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + pairs[:, 1].astype(np.uint64))
+                % np.uint64(parts)).astype(np.int64)
+        order = np.argsort(part, kind='stable')
+        bounds = np.searchsorted(part[order], np.arange(parts + 1))
+        pairs = pairs[order]
+        for i in np.flatnonzero(np.diff(bounds)):
+            with open(raw_paths[i], 'ab') as f:
+                f.write(pairs[bounds[i]:bounds[i + 1]].tobytes())
+    paths = []
+    for raw_path in raw_paths:
+        if not os.path.exists(raw_path):
+            continue
+        pairs = np.fromfile(raw_path, dtype=np.int64).reshape(-1, 2)
+        os.remove(raw_path)
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        keep = np.ones(len(pairs), dtype=bool)
+        keep[1:] = np.any(pairs[1:] != pairs[:-1], axis=1)
+        paths.append(raw_path[:-len('.bin')] + '.npy')
+        np.save(paths[-1], pairs[keep])
+    return paths
+
+
+def stream_partitions(paths, chunk_bytes=STREAM_CHUNK_BYTES):
+    for path in paths:
+        yield from stream_edges(path, chunk_bytes)
+
+
+def stream_degrees(edges):
+    # first pass: per-node degree indexed by node id, plus the number of edges; edges yields (src, dst) chunks
+    degrees = np.zeros(0, dtype=np.int64)
+    edge_count = 0
+    for src, dst in edges:
+        size = int(max(src.max(), dst.max())) + 1
+        degrees = grow(degrees, size)
+        degrees[:size] += np.bincount(src, minlength=size) + np.bincount(dst, minlength=size)
+        edge_count += len(src)
+    return degrees, edge_count
+
+
+def find_roots(parent, x):
+    # vectorized pointer jumping; compresses the paths it walks
+    roots = x
+    while True:
+        up = parent[roots]
+        if np.array_equal(up, roots):
+            break
+        roots = up
+    parent[x] = roots
+    return roots
+
+
+def union_edges(parent, src, dst):
+    while len(src):
+        ru, rv = find_roots(parent, src), find_roots(parent, dst)
+        differ = ru != rv
+        if not differ.any():
+            break
+        src, dst, ru, rv = src[differ], dst[differ], ru[differ], rv[differ]
+        # several unions may target the same root; the smallest wins and the rest retry next round
+        np.minimum.at(parent, np.maximum(ru, rv), np.minimum(ru, rv))
+
+
+def flatten(parent):
+    # after this every entry points straight at its root
+    changed = True
+    while changed:
+        changed = False
+        for start in range(0, len(parent), BLOCK):
+            block = parent[start:start + BLOCK]
+            up = parent[block]
+            if not np.array_equal(up, block):
+                parent[start:start + BLOCK] = up
+                changed = True
+
+
+class StreamingMixing:
+    # per-node co-clustered / cross-cluster edge counts for one clustering, accumulated chunk by chunk; enough for
+    # both the mixing parameter and modularity
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.in_degree = np.zeros(len(labels), dtype=np.int64)
+        self.out_degree = np.zeros(len(labels), dtype=np.int64)
+
+    def add(self, src, dst):
+        n = len(self.labels)
+        co_clustered = (self.labels[src] == self.labels[dst]) & (self.labels[src] >= 0)
+        self.in_degree += np.bincount(src[co_clustered], minlength=n) + np.bincount(dst[co_clustered], minlength=n)
+        self.out_degree += np.bincount(src[~co_clustered], minlength=n) + np.bincount(dst[~co_clustered], minlength=n)
+
+    def mixing_param(self, nodes):
+        degree = self.in_degree[nodes] + self.out_degree[nodes]
+        mus = np.divide(self.out_degree[nodes], degree, out=np.zeros(len(nodes)), where=degree != 0)
+        return np.mean(mus)
+
+    def modularity(self):
+        # twice the edge count is the degree total; nodes missing from the clustering count as singletons
+        degree = self.in_degree + self.out_degree
+        two_m = degree.sum()
+        if two_m == 0:
+            return float('nan')
+        labeled = self.labels >= 0
+        degree_sums = np.bincount(self.labels[labeled], weights=degree[labeled])
+        squares = np.sum(degree_sums ** 2) + np.sum(degree[~labeled].astype(np.float64) ** 2)
+        return float(self.in_degree.sum() / two_m - squares / two_m ** 2)
+
+
+def membership_labels(clustering_path, size):
+    # integer cluster code per node id; -1 for ids that are not in the clustering
+    pairs = np.asarray(load_membership(clustering_path, use_cache=False))
+    pairs = pairs[(pairs[:, 0] >= 0) & (pairs[:, 0] < size)]
+    _, codes = np.unique(pairs[:, 1], return_inverse=True)
+    labels = np.full(size, -1, dtype=np.int64)
+    labels[pairs[:, 0]] = codes.ravel()
+    return labels
+
+
+def streaming_statistics(edge_path, clustering_paths=(), work_dir=None, chunk_bytes=STREAM_CHUNK_BYTES):
+    # (node_count, edge_count, degrees, isolate_count, component_sizes) of the network, and for every clustering
+    # (node_count, cluster_sizes, mu, modularity); nodes missing from a clustering are left out of its cluster sizes,
+    # as in get_membership_list_from_file
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        edge_parts = partition_edges(edge_path, tmp, chunk_bytes)
+        degrees, edge_count = stream_degrees(stream_partitions(edge_parts, chunk_bytes))
+        size = len(degrees)
+        labels = [membership_labels(path, size) for path in clustering_paths]
+        mixing = [StreamingMixing(l) for l in labels]
+
+        # second pass: union-find over a disk-backed parent array, plus the mixing counts of every clustering
+        parent = np.lib.format.open_memmap(os.path.join(tmp, 'parent.npy'), mode='w+', dtype=np.int64,
+                                           shape=(size,))
+        for start in range(0, size, BLOCK):
+            parent[start:start + BLOCK] = np.arange(start, min(start + BLOCK, size))
+        for src, dst in stream_partitions(edge_parts, chunk_bytes):
+            union_edges(parent, src, dst)
+            for m in mixing:
+                m.add(src, dst)
+        flatten(parent)
+        nodes = np.flatnonzero(degrees)
+        component_sizes = np.bincount(parent[nodes])
+        del parent
+    component_sizes = component_sizes[component_sizes > 0]
+    node_degrees = degrees[nodes]
+    network = (len(nodes), edge_count, node_degrees, int(np.sum(node_degrees == 0)), component_sizes)
+    clusterings = []
+    for l, m in zip(labels, mixing):
+        node_labels = l[nodes]
+        cluster_sizes = np.bincount(node_labels[node_labels >= 0])
+        clusterings.append((len(nodes), cluster_sizes[cluster_sizes > 0], m.mixing_param(nodes), m.modularity()))
+    return network, clusterings
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from fast_io import parse_int_pairs
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_comments_and_blank_lines(tmp_path):
+    path = write(tmp_path / 'edges.tsv', '# header\n1 2\n\n3\t4\r\n  5 6  \n7 8\n\n  \n')
+    assert parse_int_pairs(path).tolist() == [[1, 2], [3, 4], [5, 6], [7, 8]]
+
+
+@pytest.mark.parametrize('text', ['1\t2\t5\n3\t4\t6\n5\t6\t1\n7\t8\t1\n', '1 2\n3\n', '1 2\n3 x\n', '1 2\n\n3 4 5 6\n'])
+def test_rejects_lines_without_two_integer_columns(tmp_path, text):
+    # a weighted edge list has an even number of values, but must not be re-paired into other edges
+    with pytest.raises(ValueError):
+        parse_int_pairs(write(tmp_path / 'edges.tsv', text))
+
+
+def test_chunks_are_parsed_in_order(tmp_path):
+    pairs = np.random.default_rng(0).integers(0, 10 ** 6, (5000, 2))
+    path = write(tmp_path / 'edges.tsv', ''.join('%d\t%d\n' % (a, b) for a, b in pairs))
+    assert np.array_equal(parse_int_pairs(path, threads=2, chunk_bytes=1000), pairs)
@@ -0,0 +1,38 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+from graph_backends import BACKENDS
+
+backends = [name for name in BACKENDS if name != 'networkit' or importlib.util.find_spec('networkit') is not None]
+
+
+@pytest.fixture
+def files(tmp_path):
+    # sparse ids, self-loops, and edges listed twice in both directions
+    rng = np.random.default_rng(6)
+    pairs = rng.integers(0, 200, (500, 2)) * 11 + 3
+    pairs = np.concatenate([pairs, pairs[:50, ::-1], [[3, 3], [14, 14]]])
+    edge_path, clustering_path = tmp_path / 'network.tsv', tmp_path / 'clustering.tsv'
+    edge_path.write_text(''.join('%d\t%d\n' % (a, b) for a, b in pairs))
+    nodes = np.unique(pairs)
+    clustering_path.write_text(''.join('%d\t%d\n' % (v, c) for v, c in zip(nodes, rng.integers(0, 15, len(nodes)))))
+    return str(edge_path), str(clustering_path)
+
+
+def summary(backend, files):
+    edge_path, clustering_path = files
+    graph = BACKENDS[backend].read(edge_path)
+    node_count, edge_count, degrees, isolate_count, component_sizes = graph.network_statistics()
+    membership = graph.read_membership(clustering_path)
+    return (node_count, edge_count, sorted(np.asarray(degrees).tolist()), isolate_count, sorted(component_sizes),
+            graph.mixing_param_edges(membership), graph.modularity_edges(membership))
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_backends_match_networkx(backend, files):
+    expected = summary('networkx', files)
+    result = summary(backend, files)
+    assert result[:5] == expected[:5]
+    assert result[5:] == pytest.approx(expected[5:], abs=1e-12)
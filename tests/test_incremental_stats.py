@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from incremental_stats import build_state, save_state, load_state, state_path, update_statistics
+from network_arrays import mixing_param_from_arrays, modularity_from_arrays
+
+
+def random_graph(rng, n, m):
+    # sparse node ids, a few self-loops, each undirected edge once
+    node_ids = rng.choice(10 * n, n, replace=False)
+    src, dst = rng.integers(0, n, m), rng.integers(0, n, m)
+    pairs = np.unique(np.stack([np.minimum(src, dst), np.maximum(src, dst)], axis=1), axis=0)
+    return node_ids, pairs[:, 0], pairs[:, 1]
+
+
+def write_pairs(path, pairs):
+    with open(path, 'w') as f:
+        f.write(''.join('%d\t%d\n' % (a, b) for a, b in pairs))
+
+
+def test_update_matches_full_state(tmp_path):
+    rng = np.random.default_rng(1)
+    node_ids, src, dst = random_graph(rng, 300, 1200)
+    before = dict(zip(node_ids.tolist(), rng.integers(0, 20, len(node_ids)).tolist()))
+    # moves into existing clusters and into clusters the previous clustering does not have
+    moved = rng.choice(node_ids, 60, replace=False).tolist()
+    diff = {v: int(rng.integers(0, 25)) for v in moved}
+    after = {**before, **diff}
+
+    previous, current, diff_path = tmp_path / 'a.tsv', tmp_path / 'b.tsv', tmp_path / 'diff.tsv'
+    write_pairs(diff_path, diff.items())
+    save_state(state_path(str(previous)), *build_state(node_ids, src, dst, before))
+    _, node_count, cluster_sizes, mu, modularity_score = update_statistics(str(previous), str(diff_path),
+                                                                           str(current))
+
+    _, labels = np.unique([after[v] for v in node_ids.tolist()], return_inverse=True)
+    labels = labels.ravel()
+    assert node_count == len(node_ids)
+    assert np.array_equal(np.sort(cluster_sizes), np.sort(np.bincount(labels)))
+    assert mu == pytest.approx(mixing_param_from_arrays(src, dst, labels), abs=1e-12)
+    assert modularity_score == pytest.approx(modularity_from_arrays(src, dst, labels), abs=1e-12)
+
+    arrays, totals = build_state(node_ids, src, dst, after)
+    updated_arrays, updated_totals = load_state(state_path(str(current)))
+    assert np.array_equal(updated_arrays['in_degree'], arrays['in_degree'])
+    assert updated_totals == pytest.approx(totals, abs=1e-9)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from lfr_accuracy import (contingency_table, pair_counts, ami_from_contingency, factorize,
+                          get_membership_list_shared_nodes, get_membership_list_add_singletons,
+                          get_label_arrays_shared_nodes, get_label_arrays_add_singletons)
+
+
+def pair_loop(true, est):
+    # the O(n^2) loop that measure_accuracy used before the contingency table
+    n = len(true)
+    tp, fp, fn, tn = 0, 0, 0, 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            if true[i] == true[j]:
+                if est[i] == est[j]:
+                    tp += 1
+                else:
+                    fn += 1
+            else:
+                if est[i] == est[j]:
+                    fp += 1
+                else:
+                    tn += 1
+    return tp, fp, fn, tn
+
+
+def test_pair_counts_match_pair_loop():
+    rng = np.random.default_rng(4)
+    n = 150
+    # dict readers give cluster ids as strings and missing nodes as their int id; 7 and '7' are different labels
+    true = [str(c) for c in rng.integers(0, 8, n)]
+    est = [str(c) if rng.random() < 0.8 else i for i, c in enumerate(rng.integers(0, 10, n))]
+    assert pair_counts(contingency_table(true, est)) == pair_loop(true, est)
+    assert pair_counts(contingency_table(np.array(true), np.array(true))) == pair_loop(true, true)
+
+
+def test_grouped_emi_matches_sklearn():
+    from sklearn.metrics import adjusted_mutual_info_score
+    rng = np.random.default_rng(2)
+    true = rng.integers(0, 40, 3000)
+    est = np.where(rng.random(3000) < 0.6, true % 30, rng.integers(0, 30, 3000))
+    contingency = contingency_table(true, est)
+    expected = adjusted_mutual_info_score(true, est)
+    assert ami_from_contingency(contingency, 'exact') == pytest.approx(expected, rel=1e-12)
+    assert ami_from_contingency(contingency, 'grouped') == pytest.approx(expected, rel=1e-9)
+    assert ami_from_contingency(contingency, 'approx') == pytest.approx(expected, rel=1e-9)
+
+
+def write_membership(path, rng, n, clusters, keep):
+    # unsorted node ids, cluster ids that are also ids of nodes missing from the file, and a node listed twice
+    nodes = rng.permutation(np.flatnonzero(rng.random(n) < keep))
+    lines = ['%d\t%d\n' % (v, c) for v, c in zip(nodes, rng.integers(0, clusters, len(nodes)))]
+    lines.append('%d\t%d\n' % (nodes[0], clusters + 1))
+    with open(path, 'w') as f:
+        f.write(''.join(lines))
+
+
+@pytest.mark.parametrize('mode', ['shared_nodes', 'add_singletons'])
+def test_label_arrays_match_membership_lists(tmp_path, mode):
+    rng = np.random.default_rng(6)
+    paths = [str(tmp_path / name) for name in ('gt.tsv', 'c1.tsv', 'c2.tsv')]
+    for path, keep in zip(paths, (0.9, 0.8, 0.7)):
+        write_membership(path, rng, 300, 40, keep)
+    lists = {'shared_nodes': get_membership_list_shared_nodes,
+             'add_singletons': get_membership_list_add_singletons}[mode](*paths)
+    arrays = {'shared_nodes': get_label_arrays_shared_nodes,
+              'add_singletons': get_label_arrays_add_singletons}[mode](*paths)
+    for labels, label_array in zip(lists, arrays):
+        # same partition of the same nodes, up to the names of the clusters
+        assert np.array_equal(factorize(labels), factorize(label_array.tolist()))
@@ -0,0 +1,37 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_backends import NetworkXBackend
+from network_arrays import graph_to_arrays, encode_membership, mixing_param_from_arrays, modularity_from_arrays
+
+
+def random_network(seed):
+    # sparse ids, a few self-loops and isolated nodes
+    rng = np.random.default_rng(seed)
+    net = nx.Graph()
+    net.add_nodes_from(rng.choice(5000, 20, replace=False).tolist())
+    net.add_edges_from((rng.choice(5000, (600, 2)) % 300 * 7).tolist())
+    membership = {v: int(rng.integers(0, 12)) for v in net.nodes}
+    return net, membership
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_mixing_param_matches_edge_loop(seed):
+    net, membership = random_network(seed)
+    nodes, src, dst = graph_to_arrays(net)
+    expected = NetworkXBackend(net).mixing_param_edges(membership)
+    assert mixing_param_from_arrays(src, dst, encode_membership(nodes, membership)) == pytest.approx(expected,
+                                                                                                      abs=1e-12)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_modularity_matches_networkx(seed):
+    net, membership = random_network(seed)
+    nodes, src, dst = graph_to_arrays(net)
+    partition = {}
+    for node, cluster in membership.items():
+        partition.setdefault(cluster, []).append(node)
+    expected = nx.community.modularity(net, partition.values())
+    assert modularity_from_arrays(src, dst, encode_membership(nodes, membership)) == pytest.approx(expected,
+                                                                                                   abs=1e-12)
@@ -0,0 +1,20 @@
+import numpy as np
+
+from parallel_stats import parallel_network_statistics
+
+
+def test_components_match_scipy():
+    import scipy.sparse as sp
+    from scipy.sparse.csgraph import connected_components
+    rng = np.random.default_rng(3)
+    n = 2000
+    src, dst = rng.integers(0, n, 1500), rng.integers(0, n, 1500)
+    node_count, edge_count, degrees, isolate_count, component_sizes = \
+        parallel_network_statistics(n, src, dst, processes=3)
+    _, components = connected_components(sp.coo_matrix((np.ones(len(src)), (src, dst)), shape=(n, n)),
+                                         directed=False)
+    expected_degrees = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+    assert (node_count, edge_count) == (n, len(src))
+    assert np.array_equal(degrees, expected_degrees)
+    assert isolate_count == int(np.sum(expected_degrees == 0))
+    assert np.array_equal(np.sort(component_sizes), np.sort(np.bincount(components)))
@@ -0,0 +1,30 @@
+import os
+
+import powerlaw_cache
+from powerlaw_cache import fit_key, evict
+
+
+def test_key_changes_with_fitter_versions(monkeypatch):
+    values = [1, 1, 2, 3, 5, 8]
+    key = fit_key(values)
+    monkeypatch.setattr(powerlaw_cache, 'powerlaw_version', lambda: '0.0')
+    assert fit_key(values) != key
+    histogram_key = fit_key(values, fitter='histogram')
+    monkeypatch.setattr(powerlaw_cache, 'CACHE_VERSION', powerlaw_cache.CACHE_VERSION + 1)
+    assert fit_key(values, fitter='histogram') != histogram_key
+
+
+def test_evict_skips_entries_removed_by_another_process(tmp_path, monkeypatch):
+    for i in range(5):
+        (tmp_path / ('%d.json' % i)).write_text('{}')
+        os.utime(tmp_path / ('%d.json' % i), (i, i))
+    stat = os.stat
+
+    def stat_after_removal(path, *args, **kwargs):
+        if path.endswith('1.json'):
+            os.remove(path)
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, 'stat', stat_after_removal)
+    evict(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == ['3.json', '4.json']
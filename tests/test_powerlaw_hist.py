@@ -0,0 +1,31 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from powerlaw_hist import fit_discrete_powerlaw
+
+
+def samples():
+    rng = np.random.default_rng(0)
+    return {
+        'zipf': rng.zipf(2.5, 3000),
+        'geometric': rng.geometric(0.05, 2000),
+        # not a power law: many singletons and uniform sizes; tau must stay in powerlaw's range
+        'singletons and uniform sizes': np.concatenate([np.ones(1322, dtype=np.int64), rng.integers(2, 801, 814)]),
+    }
+
+
+@pytest.mark.parametrize('name', list(samples()))
+def test_matches_powerlaw_fit(name):
+    import powerlaw
+    values = samples()[name]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        fit = powerlaw.Fit(values, discrete=True, verbose=False)
+        fixed = powerlaw.Fit(values, discrete=True, xmin=1, verbose=False)
+    tau, xmin = fit_discrete_powerlaw(values)
+    assert xmin == fit.power_law.xmin
+    assert tau == pytest.approx(fit.power_law.alpha, abs=1e-3)
+    assert fit_discrete_powerlaw(values, processes=2) == (tau, xmin)
+    assert fit_discrete_powerlaw(values, xmin=1)[0] == pytest.approx(fixed.power_law.alpha, abs=1e-3)
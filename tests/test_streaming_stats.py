@@ -0,0 +1,22 @@
+import numpy as np
+
+from graph_backends import read_graph
+from streaming_stats import streaming_statistics
+
+
+def test_matches_csr_backend(tmp_path):
+    rng = np.random.default_rng(5)
+    src, dst = rng.integers(1, 401, 1500), rng.integers(1, 401, 1500)
+    # every edge in both directions, and some twice, as in LFR output
+    edges = np.concatenate([np.stack([src, dst], axis=1), np.stack([dst, src], axis=1),
+                            np.stack([src[:100], dst[:100]], axis=1)])
+    edge_path = tmp_path / 'network.tsv'
+    with open(edge_path, 'w') as f:
+        f.write(''.join('%d\t%d\n' % (a, b) for a, b in edges.tolist()))
+    network, _ = streaming_statistics(str(edge_path), chunk_bytes=4096)
+    node_count, edge_count, degrees, isolate_count, component_sizes = \
+        read_graph(str(edge_path), 'csr').network_statistics()
+    assert network[:2] == (node_count, edge_count)
+    assert network[3] == isolate_count
+    assert np.array_equal(np.sort(network[2]), np.sort(degrees))
+    assert np.array_equal(np.sort(network[4]), np.sort(component_sizes))